@@ -1,7 +1,12 @@
 
 import tkinter as tk
-from tkinter import ttk, colorchooser, messagebox
-import time
+from tkinter import ttk, colorchooser, filedialog, messagebox
+
+import conics
+import scene_file
+from raster_worker import RasterWorker
+from stepper import Stepper
+from storage import FIGURES, FigureTable
 
 
 class PaintApp(tk.Tk):
@@ -19,11 +24,14 @@ class PaintApp(tk.Tk):
         self.is_debugging = False
         self.debug_pause = 10
         self.selected_color = "black"  # Цвет фигур
-        self.is_drawing = False
         self.selected_figure = "Окружность"  # Тип фигуры по умолчанию
+        self.figures = FigureTable()  # Нарисованные фигуры по столбцам: тип, центр, размеры, цвет
         self.grid_visible = True
         self.grid_step = 10
 
+        self.stepper = Stepper(self, delay=self.debug_pause, on_state=self._show_stepper_state)
+        self.raster_worker = RasterWorker(self, batch_size=256)
+
         self._setup_ui()
         self._center_window()
         self._draw_grid()  # Сетка при запуске
@@ -52,86 +60,48 @@ class PaintApp(tk.Tk):
         self.canvas.delete("all")
         self._draw_grid()
 
-    def draw_point(self, x, y):
+    def draw_point(self, x, y, color=None):
         # Рисует единичную точку на холсте.
-        self.canvas.create_oval(x, y, x + 1, y + 1, fill=self.selected_color, outline="")
+        self.canvas.create_oval(x, y, x + 1, y + 1, fill=color or self.selected_color, outline="")
         if self.is_debugging:
             print(f"{self.selected_figure.capitalize()}: (x={x}, y={y})")
-        self._pause_if_debugging()
-
-    def draw_circle(self, x0, y0, radius):
-        x, y, delta = 0, radius, 3 - 2 * radius # дельта для контроля изменения координаты y
-        while x <= y:
-            for dx, dy in [(x, y), (y, x), (-y, x), (-x, y), (-x, -y), (-y, -x), (y, -x), (x, -y)]:
-                self.draw_point(x0 + dx, y0 + dy) # # Рисуем симметричные точки окружности
-            x += 1 # Увеличиваем x для перехода к следующей точке по окружности
-            if delta > 0: # Если delta больше 0, уменьшаем y и обновляем delta
-                y -= 1
-                delta += 4 * (x - y) + 10 # Обновляем delta с учетом изменения x и y
-            else:
-                delta += 4 * x + 6 # Если delta меньше или равно 0, просто обновляем delta
-
-    def draw_ellipse(self, x0, y0, a, b):
-        x, y = 0, b
-        d1 = b ** 2 - a ** 2 * b + 0.25 * a ** 2 # Значение d1 чтобы понять нужно ли уменьшать y на следующем шаге рисования.
-        # Рисование верхней части эллипса
-        while (a ** 2) * (y - 0.5) > (b ** 2) * (x + 1):
-            for dx, dy in [(x, y), (-x, y), (x, -y), (-x, -y)]: # Рисуем симметричные точки эллипса
-                self.draw_point(x0 + dx, y0 + dy)
-            x += 1 # Увеличиваем x для перехода к следующей точке
-            if d1 < 0:
-                d1 += (2 * b ** 2) * x + b ** 2 # Если d1 меньше 0, y остается прежним, обновляем d1
-            else: # Если d1 больше или равен 0, уменьшаем y и обновляем d1
-                y -= 1
-                d1 += (2 * b ** 2) * x - (2 * a ** 2) * y + b ** 2
-# Значение d2 используется чтобы понять нужно ли увеличивать x на следующем шаге
-        d2 = b ** 2 * (x + 0.5) ** 2 + a ** 2 * (y - 1) ** 2 - a ** 2 * b ** 2
-        while y >= 0: # Рисование нижней части эллипса
-            for dx, dy in [(x, y), (-x, y), (x, -y), (-x, -y)]: # симметричные точки эллипса
-                self.draw_point(x0 + dx, y0 + dy)
-            y -= 1 # Уменьшаем y для перехода к следующей точке
-            if d2 > 0: # Если d2 больше 0, x остается прежним, обновляем d2
-                d2 += a ** 2 - 2 * a ** 2 * y
-            else: # Если d2 меньше или равен 0, увеличиваем x и обновляем d2
-                x += 1
-                d2 += (2 * b ** 2) * x - (2 * a ** 2) * y + a ** 2
-
-    def draw_hyperbola(self, x0, y0, a, b):
-        x, y = a, 0 # x инициализируется радиусом по оси x, y — 0
-        # Инициализация d1 для первой части гиперболы
-        d1 = b ** 2 * (x + 0.5) ** 2 - a ** 2 * (y + 1) ** 2 - a ** 2 * b ** 2
-        while (b ** 2) * (x - 0.5) > (a ** 2) * (y + 1): # Рисование первой ветви гиперболы
-            for dx, dy in [(x, y), (-x, y), (x, -y), (-x, -y)]: # Рисуем симметричные точки гиперболы
-                self.draw_point(x0 + dx, y0 + dy)
-
-            y += 1  # Увеличиваем y для перехода к следующей точке
-            if d1 < 0:  # Если d1 меньше 0, x остается прежним, обновляем d1
-                d1 += (2 * a ** 2) * y + a ** 2
-            else: # Если d1 больше или равен 0, увеличиваем x и обновляем d1
-                x += 1
-                d1 += (2 * a ** 2) * y - (2 * b ** 2) * x + a ** 2
-        # Инициализация d2 для второй части гиперболы
-        d2 = b ** 2 * (x + 1) ** 2 - a ** 2 * (y + 0.5) ** 2 - a ** 2 * b ** 2
-        while x < 200: # Рисование второй ветви гиперболы
-            for dx, dy in [(x, y), (-x, y), (x, -y), (-x, -y)]: # Рисуем симметричные точки гиперболы
-                self.draw_point(x0 + dx, y0 + dy)
-
-            x += 1 # Увеличиваем x для перехода к следующей точке
-            if d2 > 0: # Если d2 больше 0, y остается прежним, обновляем d2
-                d2 += b ** 2 - (2 * b ** 2) * x
-            else: # Если d2 меньше или равен 0, увеличиваем y и обновляем d2
-                y += 1
-                d2 += (2 * a ** 2) * y - (2 * b ** 2) * x + b ** 2
-
-    def draw_parabola(self, x0, y0, p):
-        # Рисует параболу, вычисляя координаты точек.
-        step = 1 # величина, на которую увеличивается x в каждой итерации
-        x = 0
-        while x <= 200: # Цикл для рисования параболы
-            y = (x ** 2) / (4 * p) # Вычисление значения y по формуле параболы:
-            self.draw_point(x0 + x, y0 - y) # Рисуем точку в правой части параболы
-            self.draw_point(x0 - x, y0 - y) # Рисуем симметричную точку в левой части параболы
-            x += step # Увеличиваем x на шаг для перехода к следующей точке
+
+    def _draw_batch(self, points, color=None):
+        for x, y in points:
+            self.draw_point(x, y, color)
+
+    # Генераторы *_points ленивые: таблица смещений строится при первой выдаче точки,
+    # поэтому при передаче в RasterWorker все вычисления идут в рабочем потоке
+    def circle_points(self, x0, y0, radius):
+        # Смещения точек окружности берутся из кэша таблиц и переносятся в центр (x0, y0)
+        for dx, dy in zip(*conics.circle_offsets(radius)):
+            yield x0 + dx, y0 + dy
+
+    def ellipse_points(self, x0, y0, a, b):
+        for dx, dy in zip(*conics.ellipse_offsets(a, b)):
+            yield x0 + dx, y0 + dy
+
+    def _visible_extent(self, x0, y0):
+        # Наибольшие смещения от центра (x0, y0), при которых хотя бы одна симметричная точка видна на холсте
+        return max(x0, self.draw_area_width - 1 - x0), max(y0, self.draw_area_height - 1 - y0)
+
+    def _visible_points(self, x0, y0, offsets):
+        for dx, dy in zip(*offsets):
+            x, y = x0 + dx, y0 + dy
+            if 0 <= x < self.draw_area_width and 0 <= y < self.draw_area_height:
+                yield x, y
+
+    def hyperbola_points(self, x0, y0, a, b):
+        x_limit, y_limit = self._visible_extent(x0, y0) # Ветви строятся только до границы холста
+        yield from self._visible_points(x0, y0, conics.hyperbola_offsets(a, b, x_limit, y_limit))
+
+    def parabola_points(self, x0, y0, p):
+        if p == 0:
+            return
+        x_limit, _ = self._visible_extent(x0, y0)
+        # Парабола уходит за верхний (p > 0) или нижний (p < 0) край холста, когда |y| превышает запас до края
+        y_limit = max(0, y0 if p > 0 else self.draw_area_height - y0)
+        yield from self._visible_points(x0, y0, conics.parabola_offsets(p, x_limit, y_limit))
 
     def _setup_ui(self):
         # Установка темной темы
@@ -146,7 +116,7 @@ class PaintApp(tk.Tk):
         button_panel = ttk.Frame(self, style="TFrame")
         button_panel.pack(side="top", fill="x", padx=10, pady=10)
 
-        self.figure_types = ["Окружность", "Эллипс", "Гипербола", "Парабола"]
+        self.figure_types = list(FIGURES)
         self.figure_selector = ttk.Combobox(button_panel, values=self.figure_types, state="readonly", width=13)
         self.figure_selector.set(self.selected_figure)
         self.figure_selector.pack(side="left", padx=5)
@@ -155,9 +125,24 @@ class PaintApp(tk.Tk):
         self.clear_button = ttk.Button(button_panel, text="Очистить", command=self.clear_canvas)
         self.clear_button.pack(side="left", padx=5)
 
+        self.open_button = ttk.Button(button_panel, text="Открыть", command=self.open_scene)
+        self.open_button.pack(side="left", padx=5)
+
+        self.save_button = ttk.Button(button_panel, text="Сохранить", command=self.save_scene)
+        self.save_button.pack(side="left", padx=5)
+
         self.debug_button = ttk.Button(button_panel, text="Отладка", command=self._toggle_debug_mode)
         self.debug_button.pack(side="left", padx=5)
 
+        self.pause_button = ttk.Button(button_panel, text="Пауза", command=self.stepper.toggle)
+        self.pause_button.pack(side="left", padx=5)
+
+        self.step_button = ttk.Button(button_panel, text="Шаг", command=self.stepper.step)
+        self.step_button.pack(side="left", padx=5)
+
+        self.cancel_button = ttk.Button(button_panel, text="Стоп", command=self.stepper.cancel_all)
+        self.cancel_button.pack(side="left", padx=5)
+
         right_panel = ttk.Frame(button_panel, style="TFrame")
         right_panel.pack(side="left", padx=5)
 
@@ -208,9 +193,34 @@ class PaintApp(tk.Tk):
                 self.canvas.create_line(0, i, self.draw_area_width, i, fill="#44474D", tags="grid_line")
 
     def clear_canvas(self):
+        self.stepper.cancel_all()
+        self.raster_worker.cancel_all()
+        self.figures.clear()
         self.canvas.delete("all")
         self._draw_grid()
 
+    def save_scene(self):
+        path = filedialog.asksaveasfilename(defaultextension=".scene", filetypes=[("Сцена", "*.scene")])
+        if path:
+            scene_file.save(path, figures=self.figures)
+
+    def open_scene(self):
+        path = filedialog.askopenfilename(filetypes=[("Сцена", "*.scene")])
+        if not path:
+            return
+        try:
+            with scene_file.SceneFile(path) as f:
+                figures = list(f.figures())
+        except (OSError, ValueError) as error:
+            messagebox.showerror("Ошибка", str(error))
+            return
+        self.clear_canvas()
+        for kind, x0, y0, size1, size2, color in figures:
+            # Каждая фигура рисуется своим цветом; точки считаются в рабочих потоках
+            self.figures.append(kind, x0, y0, size1, size2, color)
+            points = self.figure_points(kind, x0, y0, size1, size2)
+            self.raster_worker.submit(points, lambda batch, color=color: self._draw_batch(batch, color))
+
     def _set_figure_type(self, event=None):
         self.selected_figure = self.figure_selector.get()
 
@@ -221,17 +231,15 @@ class PaintApp(tk.Tk):
 
     def _update_delay(self, value):
         self.debug_pause = int(501 - float(value))
+        self.stepper.set_delay(self.debug_pause)
 
-    def draw_point(self, x, y):
-        self.canvas.create_oval(x, y, x + 2, y + 2, fill=self.selected_color, outline="")
-        if self.is_debugging:
-            print(f"{self.selected_figure}: (x={x}, y={y})")
-        self._pause_if_debugging()
+    def _show_stepper_state(self, stepper):
+        self.pause_button.configure(text="Продолжить" if stepper.paused else "Пауза")
 
-    def _pause_if_debugging(self):
+    def draw_point(self, x, y, color=None):
+        self.canvas.create_oval(x, y, x + 2, y + 2, fill=color or self.selected_color, outline="")
         if self.is_debugging:
-            self.update()
-            time.sleep(self.debug_pause / 1000)
+            print(f"{self.selected_figure}: (x={x}, y={y})")
 
     def _get_figure_sizes(self):
         try:
@@ -242,22 +250,29 @@ class PaintApp(tk.Tk):
             size1, size2 = 100, 50
         return size1, size2
 
+    def figure_points(self, kind, x0, y0, size1, size2):
+        if kind == "Окружность":
+            return self.circle_points(x0, y0, size1)
+        if kind == "Эллипс":
+            return self.ellipse_points(x0, y0, size1, size2)
+        if kind == "Гипербола":
+            return self.hyperbola_points(x0, y0, size1, size2)
+        if kind == "Парабола":
+            return self.parabola_points(x0, y0, size1)
+        return ()
+
     def _on_canvas_click(self, event):
-        if self.is_drawing:
-            return
-        self.is_drawing = True
+        # Точки считаются в рабочем потоке; щелчки во время рисования добавляют новые фигуры параллельно
         size1, size2 = self._get_figure_sizes()
-        if self.selected_figure == "Окружность":
-            self.draw_circle(event.x, event.y, size1)
-        elif self.selected_figure == "Эллипс":
-            self.draw_ellipse(event.x, event.y, size1, size2)
-        elif self.selected_figure == "Гипербола":
-            self.draw_hyperbola(event.x, event.y, size1, size2)
-        elif self.selected_figure == "Парабола":
-            self.draw_parabola(event.x, event.y, size1)
-        self.is_drawing = False
+        self.figures.append(self.selected_figure, event.x, event.y, size1, size2, self.selected_color)
+        points = self.figure_points(self.selected_figure, event.x, event.y, size1, size2)
+        if self.is_debugging:
+            self.stepper.start(points, lambda point: self.draw_point(*point))
+        else:
+            self.raster_worker.submit(points, self._draw_batch)
 
 
 if __name__ == "__main__":
     app = PaintApp()
     app.mainloop()
+    app.raster_worker.shutdown()
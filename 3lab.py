@@ -1,56 +1,65 @@
 import tkinter as tk
-import math
-from math import pow
+from array import array
+from tkinter import filedialog, messagebox
 
+import curves
+import scene_file
 
-def create_matrix(rows, cols, data):
-    """Создает матрицу размером rows x cols, заполняя ее данными из data."""
-    return [data[i * cols:(i + 1) * cols] for i in range(rows)]
-
-
-def matrix_mult(a, b):
-    """Умножение двух матриц."""
-    rows_a, cols_a = len(a), len(a[0])
-    rows_b, cols_b = len(b), len(b[0])
-
-    if cols_a != rows_b:
-        raise ValueError("Матрицы нельзя перемножить")
-
-    result = create_matrix(rows_a, cols_b, [0] * (rows_a * cols_b))
-    for i in range(rows_a):
-        for j in range(cols_b):
-            for k in range(cols_a):
-                result[i][j] += a[i][k] * b[k][j]
-    return result
-
-
-def my_linspace(start, stop, num):
-    """Генерация num равномерно распределенных значений от start до stop."""
-    step = (stop - start) / (num - 1)
-    return [start + i * step for i in range(num)]
+FRAME_MS = 16  # Не чаще одной перерисовки кривой за кадр при перетаскивании
 
 
 class Point:
+    __slots__ = ("x", "y")
+
     def __init__(self, x, y):
         self.x = x
         self.y = y
 
 
-class ControlPoint:
-    def __init__(self, x, y, radius=5, color="blue"):
-        self.x = x
-        self.y = y
-        self.radius = radius
-        self.color = color
-        self.oval = None  # id созданного объекта на канве
-
-    def draw(self, canvas):
-        x1, y1 = self.x - self.radius, self.y - self.radius
-        x2, y2 = self.x + self.radius, self.y + self.radius
-        if self.oval:
-            canvas.coords(self.oval, x1, y1, x2, y2)
-        else:
-            self.oval = canvas.create_oval(x1, y1, x2, y2, fill=self.color)
+class PointGrid:
+    """Равномерная сетка над строками PointTable для поиска точки под курсором.
+
+    В ячейках лежат номера строк (array('i')), координаты берутся из столбцов таблицы.
+    """
+
+    def __init__(self, points, cell_size=16):
+        self.points = points
+        self.cell_size = cell_size
+        self.cells = {}  # (столбец, строка) -> номера точек в ячейке
+
+    def _key(self, x, y):
+        return int(x // self.cell_size), int(y // self.cell_size)
+
+    def add(self, index):
+        key = self._key(self.points.x[index], self.points.y[index])
+        self.cells.setdefault(key, array("i")).append(index)
+
+    def move(self, index, x, y):
+        # Вызывается до записи новых координат в таблицу: старая ячейка определяется по текущим
+        old, new = self._key(self.points.x[index], self.points.y[index]), self._key(x, y)
+        if old != new:
+            cell = self.cells[old]
+            cell.remove(index)
+            if not cell:
+                del self.cells[old]
+            self.cells.setdefault(new, array("i")).append(index)
+
+    def clear(self):
+        self.cells.clear()
+
+    def nearest(self, x, y, threshold):
+        # Просматриваются только ячейки, пересекающие квадрат со стороной 2 * threshold вокруг (x, y)
+        xs, ys = self.points.x, self.points.y
+        best, best_distance = None, threshold * threshold
+        col_min, row_min = self._key(x - threshold, y - threshold)
+        col_max, row_max = self._key(x + threshold, y + threshold)
+        for col in range(col_min, col_max + 1):
+            for row in range(row_min, row_max + 1):
+                for index in self.cells.get((col, row), ()):
+                    distance = (x - xs[index]) ** 2 + (y - ys[index]) ** 2
+                    if distance < best_distance:
+                        best, best_distance = index, distance
+        return best
 
 
 class CurveEditor(tk.Tk):
@@ -60,16 +69,26 @@ class CurveEditor(tk.Tk):
         self.title("Графический редактор кривых")
         self.geometry("1000x700")
 
-        self.points = []  # Теперь список объектов ControlPoint
         self.current_curve_type = "Эрмит"
-        self.curve_lines = []
         self.selected_point = None
         self.is_dragging = False
-        self.point_limit_reached = False  # Добавляем флаг ограничения
+        self.tolerance = curves.TOLERANCE  # Точность адаптивного разбиения в пикселях; None - 100 точек на сегмент
+        self.drag_target = None  # Последняя позиция курсора, еще не отрисованная
+        self.frame_job = None
+        self.frames_rendered = 0
+        self.frames_skipped = 0  # События движения, поглощенные следующим кадром
+        self.reset_document()
 
         self.create_menu()
         self.create_canvas()
 
+    def reset_document(self):
+        # Кривые и их точки; точка - строка таблицы document.points (координаты, радиус, цвет, овал на холсте)
+        self.document = curves.CurveDocument()
+        self.point_index = PointGrid(self.document.points)
+        self.curve_lines = {}  # (кривая, сегмент) -> ломаная на холсте
+        self.active_curve = None  # Кривая, в которую добавляются новые точки
+
     def create_menu(self):
         menubar = tk.Menu(self)
 
@@ -77,6 +96,8 @@ class CurveEditor(tk.Tk):
         menu_font = ("Arial", 12)  # Размер шрифта 12, шрифт Arial
 
         filemenu = tk.Menu(menubar, tearoff=0)
+        filemenu.add_command(label="Открыть...", command=self.open_scene, font=menu_font)
+        filemenu.add_command(label="Сохранить...", command=self.save_scene, font=menu_font)
         filemenu.add_command(label="Очистить", command=self.clear_canvas, font=menu_font)
         menubar.add_cascade(label="Файл", menu=filemenu)
 
@@ -86,6 +107,17 @@ class CurveEditor(tk.Tk):
         curvemenu.add_command(label="B-сплайн", command=lambda: self.set_curve_type("B-сплайн"), font=menu_font)
         menubar.add_cascade(label="Кривые", menu=curvemenu)
 
+        precisionmenu = tk.Menu(menubar, tearoff=0)
+        self.tolerance_var = tk.StringVar(value=str(self.tolerance))
+        for tolerance in (0.1, 0.25, 0.5, 1, 2):
+            precisionmenu.add_radiobutton(label=f"{tolerance} пикс.", value=str(tolerance), variable=self.tolerance_var,
+                                          command=lambda tolerance=tolerance: self.set_tolerance(tolerance),
+                                          font=menu_font)
+        precisionmenu.add_radiobutton(label=f"{curves.SAMPLES} точек на сегмент", value="None",
+                                      variable=self.tolerance_var, command=lambda: self.set_tolerance(None),
+                                      font=menu_font)
+        menubar.add_cascade(label="Точность", menu=precisionmenu)
+
         self.config(menu=menubar)
 
     def create_canvas(self):
@@ -98,203 +130,128 @@ class CurveEditor(tk.Tk):
     def set_curve_type(self, curve_type):
         self.current_curve_type = curve_type
         print(f"Выбран тип кривой: {curve_type}")
-        self.point_limit_reached = False  # Сбрасываем флаг при смене типа кривой
+        self.active_curve = None  # Следующая точка начнет новую кривую выбранного типа
+
+    def set_tolerance(self, tolerance):
+        self.tolerance = tolerance
+        self.draw_curve()
 
     def clear_canvas(self):
-        self.points = []
         self.canvas.delete("all")
-        self.curve_lines = []
+        self.reset_document()
         self.selected_point = None
-        self.point_limit_reached = False  # Сбрасываем флаг при очистке
         print("Очистка полотна")
 
-    def on_canvas_click(self, event):
-        x, y = event.x, event.y
+    def save_scene(self):
+        path = filedialog.asksaveasfilename(defaultextension=".scene", filetypes=[("Сцена", "*.scene")])
+        if path:
+            scene_file.save(path, points=self.document.points, curves=self.document.curves)
 
-        if self.current_curve_type in ("Эрмит", "Безье") and len(self.points) >= 4:
-            self.point_limit_reached = True  # Устанавливаем флаг, что больше точек не надо
+    def open_scene(self):
+        path = filedialog.askopenfilename(filetypes=[("Сцена", "*.scene")])
+        if not path:
+            return
+        try:
+            with scene_file.SceneFile(path) as f:
+                loaded = list(f.curves())
+        except (OSError, ValueError) as error:
+            messagebox.showerror("Ошибка", str(error))
+            return
+        self.clear_canvas()
+        for curve_type, points in loaded:
+            curve = self.document.add_curve(curve_type)
+            for x, y, radius, color in points:
+                self.place_point(curve, x, y, radius, color)
+        self.render_curves()  # Все сегменты загруженных кривых считаются одним пакетом
 
-        if self.point_limit_reached:
-            # Для Безье и Эрмита больше 4 точек не добавится
-            clicked_point = self.find_point_near(x, y)
-            if clicked_point:
-                self.selected_point = clicked_point
-                self.is_dragging = True
-            else:
-                self.selected_point = None
+    def on_canvas_click(self, event):
+        clicked_point = self.find_point_near(event.x, event.y)
+        if clicked_point is not None:
+            self.selected_point = clicked_point
+            self.is_dragging = True
         else:
-            clicked_point = self.find_point_near(x, y)
-            if clicked_point:
-                self.selected_point = clicked_point
-                self.is_dragging = True
-            else:
-                self.selected_point = None
-                point = ControlPoint(x, y)
-                self.points.append(point)
-                point.draw(self.canvas)
-
-                if len(self.points) > 1:
-                    self.draw_curve()
+            self.selected_point = None
+            self.add_point(event.x, event.y)
+
+    def add_point(self, x, y):
+        # Эрмит и Безье строятся по четырем точкам, после этого щелчок начинает новую кривую
+        if self.active_curve is None or self.document.is_complete(self.active_curve):
+            self.active_curve = self.document.add_curve(self.current_curve_type)
+        point = self.place_point(self.active_curve, x, y)
+        self.render_curves()
+        return point
+
+    def place_point(self, curve, x, y, radius=5, color="blue"):
+        # Точка добавляется в документ и на холст; кривая перерисовывается отдельно. Возвращает номер точки
+        index = self.document.add_point(curve, x, y, radius, color)
+        self.point_index.add(index)
+        self.draw_point(index)
+        return index
+
+    def draw_point(self, index):
+        points = self.document.points
+        x, y, radius = points.x[index], points.y[index], points.radius[index]
+        if points.item[index]:
+            self.canvas.coords(points.item[index], x - radius, y - radius, x + radius, y + radius)
+        else:
+            points.item[index] = self.canvas.create_oval(x - radius, y - radius, x + radius, y + radius,
+                                                         fill=points.palette[points.color[index]])
 
     def on_canvas_drag(self, event):
-        if self.selected_point and self.is_dragging:
-            self.selected_point.x = event.x
-            self.selected_point.y = event.y
-            self.selected_point.draw(self.canvas)
-            self.draw_curve()
+        # Событие только запоминает позицию; кривая перерисовывается один раз за кадр по таймеру
+        if self.selected_point is not None and self.is_dragging:
+            if self.drag_target is not None:
+                self.frames_skipped += 1
+            self.drag_target = (event.x, event.y)
+            if self.frame_job is None:
+                self.frame_job = self.after(FRAME_MS, self.render_frame)
+
+    def render_frame(self):
+        self.frame_job = None
+        if self.drag_target is None or self.selected_point is None:
+            return
+        x, y = self.drag_target
+        self.drag_target = None
+        self.frames_rendered += 1
+        self.move_point(self.selected_point, x, y)
+
+    def move_point(self, index, x, y):
+        self.point_index.move(index, x, y)
+        self.document.move_point(index, x, y)
+        self.draw_point(index)
+        self.render_curves()
 
     def on_canvas_release(self, event):
+        # Последняя позиция отрисовывается сразу, чтобы точка встала точно под курсор
+        if self.frame_job is not None:
+            self.after_cancel(self.frame_job)
+        self.render_frame()
+        if self.is_dragging:
+            print(f"Кадров отрисовано: {self.frames_rendered}, пропущено событий: {self.frames_skipped}")
         self.is_dragging = False
         self.selected_point = None
 
     def find_point_near(self, x, y, threshold=10):
-        for point in self.points:
-            distance = math.sqrt((x - point.x) ** 2 + (y - point.y) ** 2)
-            if distance < threshold:
-                return point
-        return None
+        # Ближайшая точка не дальше threshold; проверяются только соседние ячейки сетки
+        return self.point_index.nearest(x, y, threshold)
 
     def draw_curve(self):
-        # Очищаем предыдущие линии кривых
-        for line in self.curve_lines:
-            self.canvas.delete(line)
-        self.curve_lines = []
-
-        if self.current_curve_type == "Эрмит":
-            if len(self.points) >= 4:
-                self.draw_hermite_curve()
-        elif self.current_curve_type == "Безье":
-            if len(self.points) >= 4:  # Теперь нужно 4 точки
-                self.draw_bezier_curve()
-        elif self.current_curve_type == "B-сплайн":
-            if len(self.points) >= 2:
-                self.draw_bspline_curve()
-
-    def draw_hermite_curve(self):
-        if len(self.points) < 4: # # Проверяем, достаточно ли точек для построения кривой
-            return
-        # Получаем координаты последних четырех точек
-        p0 = [self.points[-4].x, self.points[-4].y] # 1
-        p1 = [self.points[-3].x, self.points[-3].y] # 2
-        r0 = [self.points[-2].x - p0[0], self.points[-2].y - p0[1]] # Вектор касательной для первой точки
-        r1 = [self.points[-1].x - p1[0], self.points[-1].y - p1[1]] # Вектор касательной для 2 точки
-        # Генерируем 100 равномерно распределенных значений t от 0 до 1
-        t = my_linspace(0, 1, 100)
-
-        # Матрица Эрмита, описывающая формулу для вычисления кривой
-        m_hermite = create_matrix(4, 4, [
-            2, -2, 1, 1,
-            -3, 3, -2, -1,
-            0, 0, 1, 0,
-            1, 0, 0, 0
-        ])
-
-        # Формирование матрицы параметров t
-        t_vector_data = [[pow(val, 3), pow(val, 2), val, 1] for val in t]
-
-        # Вычисляем значения x и y для кривой Эрмита
-        hermite_x = matrix_mult(m_hermite, create_matrix(4, 1, [p0[0], p1[0], r0[0], r1[0]]))
-        hermite_y = matrix_mult(m_hermite, create_matrix(4, 1, [p0[1], p1[1], r0[1], r1[1]]))
-        # Вычисляем координаты кривой по каждому значению t
-        curve_x = [sum(ti[j] * hermite_x[j][0] for j in range(4)) for ti in t_vector_data]
-        curve_y = [sum(ti[j] * hermite_y[j][0] for j in range(4)) for ti in t_vector_data]
-
-        # Рисование кривой
-        for i in range(len(curve_x) - 1):
-            x1, y1 = curve_x[i], curve_y[i] # Начальные координаты
-            x2, y2 = curve_x[i + 1], curve_y[i + 1] # Конечные координаты
-            line = self.canvas.create_line(x1, y1, x2, y2, fill="orange")   # Рисуем линию между точками
-            self.curve_lines.append(line)
-
-    def draw_bezier_curve(self):
-        if len(self.points) < 4: # Проверяем, достаточно ли точек для построения кривой
-            return
-        # Получаем координаты контрольных точек
-        p0 = [self.points[-4].x, self.points[-4].y]
-        p3 = [self.points[-3].x, self.points[-3].y]
-        p1 = [self.points[-2].x, self.points[-2].y]
-        p2 = [self.points[-1].x, self.points[-1].y]
-        # Генерируем 100 равномерно распределенных значений t от 0 до 1
-        t = my_linspace(0, 1, 100)
-        # Матрица Безье, описывающая формулу для вычисления кривой
-        m_bezier = create_matrix(4, 4, [
-            -1, 3, -3, 1,
-            3, -6, 3, 0,
-            -3, 3, 0, 0,
-            1, 0, 0, 0
-        ])
-        # Формируем матрицу параметров t для вычисления значений кривой
-        t_vector_data = [[pow(val, 3), pow(val, 2), val, 1] for val in t]
-        # Вычисление значений x и y для кривой Безье
-        bezier_x = matrix_mult(m_bezier, create_matrix(4, 1, [p0[0], p1[0], p2[0], p3[0]]))
-        bezier_y = matrix_mult(m_bezier, create_matrix(4, 1, [p0[1], p1[1], p2[1], p3[1]]))
-        # Вычисляем координаты кривой по каждому значению t
-        curve_x = [sum(ti[j] * bezier_x[j][0] for j in range(4)) for ti in t_vector_data]
-        curve_y = [sum(ti[j] * bezier_y[j][0] for j in range(4)) for ti in t_vector_data]
-        # Рисуем кривую
-        for i in range(len(curve_x) - 1):
-            x1, y1 = curve_x[i], curve_y[i] # Начальные координаты
-            x2, y2 = curve_x[i + 1], curve_y[i + 1] # конечные координаты
-            line = self.canvas.create_line(x1, y1, x2, y2, fill="purple")  # Рисуем линию между точками
-            self.curve_lines.append(line)
-
-    def draw_bspline_curve(self):
-        # Проверяем, достаточно ли точек
-        if len(self.points) < 2:
-            return
-
-        # Извлекаем координаты контрольных точек
-        points = [[point.x, point.y] for point in self.points]
-        n = len(points) - 1
-
-        # Расширяем список точек, если контрольных точек больше или равно 3
-        if len(points) >= 3:
-            extended_points = points + [points[0], points[1], points[2]]  # Добавляем первые три точки
-        else:
-            extended_points = points  # Если меньше 3, используем только существующие точки
-
-        all_curve_segments = []
-        # Проходим по всем сегментам в расширенном списке точек
-        for i in range(len(extended_points) - 3):
-            p0 = extended_points[i]
-            p1 = extended_points[i + 1]
-            p2 = extended_points[i + 2]
-            p3 = extended_points[i + 3]
-
-            # Генерируем 100 равномерно распределенных значений t от 0 до 1
-            t = my_linspace(0, 1, 100)
-
-            # Матрица B-сплайн, описывающая формулу для вычисления кривой
-            m_bspline = create_matrix(4, 4, [
-                -1 / 6, 3 / 6, -3 / 6, 1 / 6,
-                3 / 6, -6 / 6, 3 / 6, 0,
-                -3 / 6, 0, 3 / 6, 0,
-                1 / 6, 4 / 6, 1 / 6, 0
-            ])
-
-            # Формируем матрицу параметров t для вычисления значений кривой
-            t_vector_data = [[pow(val, 3), pow(val, 2), val, 1] for val in t]
-
-            # Вычисление значений x и y для B-сплайна
-            bspline_x = matrix_mult(m_bspline, create_matrix(4, 1, [p0[0], p1[0], p2[0], p3[0]]))
-            bspline_y = matrix_mult(m_bspline, create_matrix(4, 1, [p0[1], p1[1], p2[1], p3[1]]))
-
-            # Вычисляем координаты кривой по каждому значению t
-            curve_x = [sum(ti[j] * bspline_x[j][0] for j in range(4)) for ti in t_vector_data]
-            curve_y = [sum(ti[j] * bspline_y[j][0] for j in range(4)) for ti in t_vector_data]
-
-            # Добавляем сегмент кривой в общий список сегментов
-            all_curve_segments.append(list(zip(curve_x, curve_y)))
-
-        # Рисуем все сегменты кривой
-        for curve in all_curve_segments:
-            for i in range(len(curve) - 1):
-                x1, y1 = curve[i][0], curve[i][1]  # Начальные координаты отрезка
-                x2, y2 = curve[i + 1][0], curve[i + 1][1]  # Конечные координаты отрезка
-                line = self.canvas.create_line(x1, y1, x2, y2, fill="cyan")  # Рисуем линию между точками
-                self.curve_lines.append(line) 
+        # Полная перерисовка всех кривых документа (например, после смены точности)
+        self.document.mark_all_dirty()
+        self.render_curves()
+
+    def render_curves(self):
+        # Грязные сегменты всех кривых считаются одним пакетом; каждый сегмент - одна ломаная на холсте,
+        # у которой при перерисовке меняются только координаты
+        for key, coords in self.document.evaluate_dirty(self.tolerance).items():
+            line = self.curve_lines.get(key)
+            if line is None:
+                color = curves.COLORS[self.document.curves[key[0]][0]]
+                self.curve_lines[key] = self.canvas.create_line(*coords, fill=color)
+            else:
+                self.canvas.coords(line, *coords)
 
 
 if __name__ == "__main__":
     app = CurveEditor()
-    app.mainloop()
\ No newline at end of file
+    app.mainloop()
\ No newline at end of file
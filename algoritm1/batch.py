@@ -0,0 +1,43 @@
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+def as_segments(segments):
+    return np.asarray(segments, dtype=float).reshape(-1, 4)
+
+
+def ramp(counts):
+    # Для каждого отрезка индексы 0..count-1, склеенные в один массив, и номер отрезка для каждого индекса
+    counts = np.asarray(counts, dtype=np.int64)
+    owners = np.repeat(np.arange(len(counts)), counts)
+    starts = np.cumsum(counts) - counts
+    return np.arange(counts.sum()) - starts[owners], owners
+
+
+def clip_parameters(x0, y0, x1, y1, clip, margin=0):
+    # Лианг-Барски по массивам: параметры t0, t1 части каждого отрезка внутри clip, расширенного на margin;
+    # у отрезков мимо clip t0 > t1. Границы clip могут быть и массивами - своими для каждого отрезка
+    x_min, y_min, x_max, y_max = clip
+    dx = x1 - x0
+    dy = y1 - y0
+    t0 = np.zeros(len(x0))
+    t1 = np.ones(len(x0))
+    with np.errstate(divide="ignore", invalid="ignore"):
+        for p, q in ((-dx, x0 - x_min + margin), (dx, x_max + margin - x0),
+                     (-dy, y0 - y_min + margin), (dy, y_max + margin - y0)):
+            ratio = q / p
+            t0 = np.where(p < 0, np.maximum(t0, ratio), t0)
+            t1 = np.where(p > 0, np.minimum(t1, ratio), t1)
+            t1 = np.where((p == 0) & (q < 0), -1.0, t1)
+    return t0, t1
+
+
+def visible_steps(x0, y0, x1, y1, steps, clip, margin=1):
+    # Для каждого отрезка из steps шагов диапазон first..last (включительно), который может попасть в clip,
+    # с запасом margin на округление; у отрезков мимо clip диапазон пустой
+    t0, t1 = clip_parameters(x0, y0, x1, y1, clip, margin)
+    first = np.maximum(np.floor(t0 * steps) - 1, 0).astype(np.int64)
+    last = np.minimum(np.ceil(t1 * steps) + 1, steps).astype(np.int64)
+    return first, np.where(t0 > t1, first - 1, last)
@@ -1,7 +1,18 @@
 import time
 
+try:
+    import numpy as np
+except ImportError:
+    np = None
 
-def draw_line(canvas, x0, y0, x1, y1, debug=False):
+from algoritm1.batch import as_segments, ramp, visible_steps
+from algoritm1.cache import cached_pixels, shifted_pattern
+
+
+def pixels(x0, y0, x1, y1, clip=None):
+    if clip is not None:
+        yield from _clipped_pixels(x0, y0, x1, y1, clip)
+        return
 
     dx = abs(x1 - x0)
     dy = abs(y1 - y0)
@@ -12,11 +23,7 @@ def draw_line(canvas, x0, y0, x1, y1, debug=False):
     err = dx - dy
 
     while True:
-        canvas.create_rectangle(x0, y0, x0 + 1, y0 + 1, fill="black", outline="black")
-
-        if debug:
-            canvas.update()
-            time.sleep(0.05)
+        yield x0, y0
 
         if x0 == x1 and y0 == y1:
             break
@@ -32,3 +39,164 @@ def draw_line(canvas, x0, y0, x1, y1, debug=False):
             y0 += sy
 
 
+def cached_columns(x0, y0, x1, y1):
+    # Пиксели отрезка столбцами из кэша узоров (algoritm1.cache) или None, если отрезок не кэшируется
+    return shifted_pattern(pixels, x0, y0, x1, y1)
+
+
+def draw_line(canvas, x0, y0, x1, y1, debug=False, clip=None):
+    for x, y in cached_pixels(pixels, x0, y0, x1, y1, clip):
+        canvas.create_rectangle(x, y, x + 1, y + 1, fill="black", outline="black")
+
+        if debug:
+            canvas.update()
+            time.sleep(0.05)
+
+
+def _run_start(major, minor, j):
+    # Первый шаг по главной оси, на котором смещение по второй оси достигает j
+    if j <= 0:
+        return 0
+    if j > minor:
+        return major + 1
+    return -(-(2 * major * j - major + 1) // (2 * minor))
+
+
+def _visible_steps(x0, y0, x1, y1, clip):
+    # Отсечение в целых числах: диапазон шагов по главной оси, пиксели которых лежат в clip.
+    # Сами пиксели не меняются - отрезок не укорачивается, а начинается с нужного шага
+    dx = abs(x1 - x0)
+    dy = abs(y1 - y0)
+    sx = 1 if x0 < x1 else -1
+    sy = 1 if y0 < y1 else -1
+    shallow = dx >= dy
+    major, minor = (dx, dy) if shallow else (dy, dx)
+
+    def step_range(start, sign, low, high):
+        return (low - start, high - start) if sign > 0 else (start - high, start - low)
+
+    x_steps = step_range(x0, sx, clip[0], clip[2])
+    y_steps = step_range(y0, sy, clip[1], clip[3])
+    major_steps, minor_steps = (x_steps, y_steps) if shallow else (y_steps, x_steps)
+
+    j_first, j_last = max(0, minor_steps[0]), min(minor, minor_steps[1])
+    if j_first > j_last:
+        return None
+    first = max(0, major_steps[0], _run_start(major, minor, j_first))
+    last = min(major, major_steps[1], _run_start(major, minor, j_last + 1) - 1)
+    if first > last:
+        return None
+    return first, last
+
+
+def _clipped_pixels(x0, y0, x1, y1, clip):
+    steps = _visible_steps(x0, y0, x1, y1, clip)
+    if steps is None:
+        return
+
+    dx = abs(x1 - x0)
+    dy = abs(y1 - y0)
+    sx = 1 if x0 < x1 else -1
+    sy = 1 if y0 < y1 else -1
+    shallow = dx >= dy
+    major, minor = (dx, dy) if shallow else (dy, dx)
+
+    first, last = steps
+    j, err = divmod(2 * minor * first + max(major - 1, 0), max(2 * major, 1))
+    for i in range(first, last + 1):
+        if shallow:
+            yield x0 + sx * i, y0 + sy * j
+        else:
+            yield x0 + sx * j, y0 + sy * i
+
+        err += 2 * minor
+        if err >= 2 * major:
+            err -= 2 * major
+            j += 1
+
+
+def spans(x0, y0, x1, y1, clip=None):
+    # Run-slice: вместо отдельных пикселей выдаются горизонтальные или вертикальные серии
+    # (x_start, y_start, x_end, y_end) включительно, по одному делению на серию
+
+    dx = abs(x1 - x0)
+    dy = abs(y1 - y0)
+
+    sx = 1 if x0 < x1 else -1
+    sy = 1 if y0 < y1 else -1
+
+    shallow = dx >= dy
+    major, minor = (dx, dy) if shallow else (dy, dx)
+
+    first, last = 0, major
+    if clip is not None:
+        steps = _visible_steps(x0, y0, x1, y1, clip)
+        if steps is None:
+            return
+        first, last = steps
+
+    j = (2 * minor * first + max(major - 1, 0)) // max(2 * major, 1)
+    start = first
+    while start <= last:
+        end = min(last, _run_start(major, minor, j + 1) - 1)
+
+        if shallow:
+            xa, xb = x0 + sx * start, x0 + sx * end
+            y = y0 + sy * j
+            yield min(xa, xb), y, max(xa, xb), y
+        else:
+            ya, yb = y0 + sy * start, y0 + sy * end
+            x = x0 + sx * j
+            yield x, min(ya, yb), x, max(ya, yb)
+
+        start = end + 1
+        j += 1
+
+
+def draw_spans(canvas, x0, y0, x1, y1, debug=False, clip=None):
+    for xa, ya, xb, yb in spans(x0, y0, x1, y1, clip):
+        canvas.create_rectangle(xa, ya, xb + 1, yb + 1, fill="black", outline="black")
+
+        if debug:
+            canvas.update()
+            time.sleep(0.05)
+
+
+def draw_lines(segments, clip=None):
+    # clip - как в pixels(): вычисляются только шаги рядом с прямоугольником; пиксель Брезенхэма
+    # отстоит от прямой меньше чем на пиксель, поэтому запаса в один шаг достаточно
+    if np is None:
+        return _draw_lines_python(segments, clip)
+
+    segments = as_segments(segments).astype(np.int64)
+    x0, y0, x1, y1 = segments.T
+    dx = np.abs(x1 - x0)
+    dy = np.abs(y1 - y0)
+    sx = np.where(x0 < x1, 1, -1)
+    sy = np.where(y0 < y1, 1, -1)
+
+    # Замкнутая форма того же цикла: шаг по главной оси i, по второй оси (2 * d_minor * i + d_major - 1) // (2 * d_major)
+    major = np.maximum(dx, dy)
+    minor = np.minimum(dx, dy)
+    first = np.zeros_like(major)
+    last = major
+    if clip is not None:
+        first, last = visible_steps(x0, y0, x1, y1, major, clip)
+    i, owners = ramp(np.maximum(last - first + 1, 0))
+    i = i + first[owners]
+    major_o = major[owners]
+    j = (2 * minor[owners] * i + np.maximum(major_o - 1, 0)) // np.maximum(2 * major_o, 1)
+
+    shallow = (dx >= dy)[owners]
+    xs = x0[owners] + sx[owners] * np.where(shallow, i, j)
+    ys = y0[owners] + sy[owners] * np.where(shallow, j, i)
+    return xs, ys
+
+
+def _draw_lines_python(segments, clip=None):
+    xs, ys = [], []
+    for x0, y0, x1, y1 in segments:
+        for x, y in pixels(int(x0), int(y0), int(x1), int(y1), clip):
+            xs.append(x)
+            ys.append(y)
+    return xs, ys
@@ -0,0 +1,79 @@
+"""Кэш растеризации отрезков, не зависящий от положения.
+
+Отрезок одной формы - одинаковые (dx, dy) - дает один и тот же узор
+пикселей в любом месте изображения. Узор считается один раз для отрезка
+из начала координат и хранится столбцами array; при повторе пиксели
+получаются переносом узора в начало отрезка - одним сложением над столбцами,
+и готовые столбцы целиком пишутся в буфер кадра (FrameBuffer.put_pixels,
+put_intensities).
+
+Кэшируются только отрезки с целыми концами: при дробных концах округление
+в плавающей точке зависит от положения, и перенос узора мог бы сдвинуть
+пиксель. Формы, у которых округление в алгоритме попадает точно на
+границу пикселя, алгоритм отмечает функцией safe, и они считаются
+напрямую. Отрезки с отсечением тоже считаются напрямую: алгоритм с clip
+не вычисляет невидимые пиксели, а узор пришлось бы строить целиком.
+"""
+from array import array
+from functools import lru_cache
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+CACHE_SIZE = 1024 # Сколько узоров хранится; дольше всех не использованные вытесняются
+MAX_PATTERN = 4096 # Более длинные отрезки рисуются без кэша: узоры редко повторяются и занимают много памяти
+MAX_COORDINATE = 1 << 20 # Дальше от начала координат погрешность вычислений уже может сдвинуть пиксель
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def pattern(pixels, dx, dy, safe=None):
+    # Узор отрезка (0, 0) - (dx, dy): смещения пикселей и покрытие (только для Ву) по столбцам,
+    # или None, если форму нельзя переносить
+    if safe is not None and not safe(dx, dy):
+        return None
+    xs, ys, coverage = array("i"), array("i"), array("d")
+    for pixel in pixels(0, 0, dx, dy):
+        xs.append(pixel[0])
+        ys.append(pixel[1])
+        if len(pixel) > 2:
+            coverage.append(pixel[2])
+    return xs, ys, coverage
+
+
+def _cacheable(x0, y0, x1, y1):
+    return (max(abs(x1 - x0), abs(y1 - y0)) <= MAX_PATTERN
+            and all(float(v).is_integer() and abs(v) < MAX_COORDINATE for v in (x0, y0, x1, y1)))
+
+
+def shifted_pattern(pixels, x0, y0, x1, y1, safe=None):
+    # Пиксели отрезка столбцами (xs, ys) или (xs, ys, покрытие), как у draw_lines, перенесенные из узора;
+    # None, если отрезок не кэшируется
+    entry = pattern(pixels, int(x1 - x0), int(y1 - y0), safe) if _cacheable(x0, y0, x1, y1) else None
+    if entry is None:
+        return None
+    bx, by = int(x0), int(y0)
+    xs, ys, coverage = entry
+    if np is not None:
+        columns = (np.frombuffer(xs, dtype=np.intc) + bx, np.frombuffer(ys, dtype=np.intc) + by)
+        return columns + (np.frombuffer(coverage, dtype=np.float64),) if coverage else columns
+    columns = ([x + bx for x in xs], [y + by for y in ys])
+    return columns + (list(coverage),) if coverage else columns
+
+
+def cached_pixels(pixels, x0, y0, x1, y1, clip=None, safe=None):
+    # Те же точки, что pixels(x0, y0, x1, y1, clip); без отсечения узор берется из кэша
+    columns = shifted_pattern(pixels, x0, y0, x1, y1, safe) if clip is None else None
+    if columns is None:
+        return pixels(x0, y0, x1, y1, clip)
+    return zip(*(column.tolist() if np is not None else column for column in columns))
+
+
+def cache_info():
+    # Попадания, промахи и заполнение кэша узоров
+    return pattern.cache_info()
+
+
+def cache_clear():
+    pattern.cache_clear()
@@ -0,0 +1,25 @@
+def liang_barsky(x0, y0, x1, y1, clip, margin=0):
+    # Параметры t0 <= t1 части отрезка x0 + t * dx внутри прямоугольника clip, расширенного на margin,
+    # или None, если отрезок проходит мимо
+    x_min, y_min, x_max, y_max = clip
+    dx = x1 - x0
+    dy = y1 - y0
+    t0, t1 = 0.0, 1.0
+
+    for p, q in ((-dx, x0 - x_min + margin), (dx, x_max + margin - x0),
+                 (-dy, y0 - y_min + margin), (dy, y_max + margin - y0)):
+        if p == 0:
+            if q < 0:
+                return None
+        elif p < 0:
+            t0 = max(t0, q / p)
+        else:
+            t1 = min(t1, q / p)
+
+    if t0 > t1:
+        return None
+    return t0, t1
+
+
+def contains(clip, x, y):
+    return clip[0] <= x <= clip[2] and clip[1] <= y <= clip[3]
@@ -1,27 +1,99 @@
+import math
 import time
 
+try:
+    import numpy as np
+except ImportError:
+    np = None
 
-def draw_line(canvas, x0, y0, x1, y1, debug=False):
+from algoritm1.batch import as_segments, ramp, visible_steps
+from algoritm1.cache import cached_pixels, shifted_pattern
+from algoritm1.clipping import contains, liang_barsky
+
+
+def pixels(x0, y0, x1, y1, clip=None):
 
     dx = x1 - x0
     dy = y1 - y0
 
     steps = int(max(abs(dx), abs(dy)))
     if steps == 0:
-        canvas.create_rectangle(round(x0), round(y0), round(x0) + 1, round(y0) + 1, fill="black", outline="black")
+        if clip is None or contains(clip, round(x0), round(y0)):
+            yield round(x0), round(y0)
         return
 
     x_inc = dx / steps
     y_inc = dy / steps
 
-    x, y = x0, y0
+    first, last = 0, steps
+    if clip is not None:
+        # Шаги, которые могут попасть в область вывода (с запасом на округление)
+        visible = liang_barsky(x0, y0, x1, y1, clip, margin=1)
+        if visible is None:
+            return
+        first = max(0, math.floor(visible[0] * steps) - 1)
+        last = min(steps, math.ceil(visible[1] * steps) + 1)
+
+    # Точка шага считается от начала отрезка, а не накоплением: тогда с отсечением и без
+    # него на каждом шаге одно и то же значение и одно и то же округление
+    for i in range(first, last + 1):
+        x = round(x0 + i * x_inc)
+        y = round(y0 + i * y_inc)
+        if clip is None or contains(clip, x, y):
+            yield x, y
+
+
+def _translation_safe(dx, dy):
+    # Ни одна точка x0 + k * dx / steps не попадает точно на середину пикселя:
+    # там round() решает погрешность вычисления, а она зависит от положения отрезка
+    steps = max(abs(dx), abs(dy))
+    return steps == 0 or all((steps // math.gcd(d, steps)) % 2 for d in (dx, dy))
+
+
+def cached_columns(x0, y0, x1, y1):
+    # Пиксели отрезка столбцами из кэша узоров (algoritm1.cache) или None, если отрезок не кэшируется
+    return shifted_pattern(pixels, x0, y0, x1, y1, _translation_safe)
+
 
-    for i in range(steps + 1):
-        canvas.create_rectangle(round(x), round(y), round(x) + 1, round(y) + 1, fill="black", outline="black")
+def draw_line(canvas, x0, y0, x1, y1, debug=False, clip=None):
+    for x, y in cached_pixels(pixels, x0, y0, x1, y1, clip, _translation_safe):
+        canvas.create_rectangle(x, y, x + 1, y + 1, fill="black", outline="black")
 
         if debug:
             canvas.update()
             time.sleep(0.05)
 
-        x += x_inc
-        y += y_inc
+
+def draw_lines(segments, clip=None):
+    # clip - как в pixels(): шаги, не задевающие прямоугольник, не вычисляются; пиксели с запасом
+    # на округление могут выйти за clip, их отбрасывает буфер кадра
+    if np is None:
+        return _draw_lines_python(segments, clip)
+
+    segments = as_segments(segments)
+    x0, y0, x1, y1 = segments.T
+    dx = x1 - x0
+    dy = y1 - y0
+
+    steps = np.maximum(np.abs(dx), np.abs(dy)).astype(np.int64)
+    safe_steps = np.maximum(steps, 1)
+    first = np.zeros_like(steps)
+    last = steps
+    if clip is not None:
+        first, last = visible_steps(x0, y0, x1, y1, steps, clip)
+
+    # Те же операции, что в pixels(): x0 + i * x_inc, поэтому округление совпадает поточечно
+    i, owners = ramp(np.maximum(last - first + 1, 0))
+    i = i + first[owners]
+    xs = np.round(x0[owners] + i * (dx / safe_steps)[owners]).astype(np.int64)
+    ys = np.round(y0[owners] + i * (dy / safe_steps)[owners]).astype(np.int64)
+    return xs, ys
+
+
+def _draw_lines_python(segments, clip=None):
+    xs, ys = [], []
+    for x0, y0, x1, y1 in segments:
+        for x, y in pixels(x0, y0, x1, y1, clip):
+            xs.append(x)
+            ys.append(y)
+    return xs, ys
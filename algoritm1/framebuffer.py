@@ -0,0 +1,198 @@
+import struct
+import zlib
+from functools import lru_cache
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+_NAMED_COLORS = {
+    "black": (0, 0, 0),
+    "white": (255, 255, 255),
+    "red": (255, 0, 0),
+    "green": (0, 128, 0),
+    "blue": (0, 0, 255),
+    "yellow": (255, 255, 0),
+    "cyan": (0, 255, 255),
+    "magenta": (255, 0, 255),
+    "orange": (255, 165, 0),
+    "purple": (128, 0, 128),
+    "gray": (190, 190, 190),
+    "grey": (190, 190, 190),
+    "lightgray": (211, 211, 211),
+}
+
+
+@lru_cache(maxsize=256)
+def parse_color(color):
+    if isinstance(color, tuple):
+        return color
+    if color.startswith("#"):
+        digits = color[1:]
+        if len(digits) == 3:
+            digits = "".join(ch * 2 for ch in digits)
+        if len(digits) == 6:
+            return int(digits[0:2], 16), int(digits[2:4], 16), int(digits[4:6], 16)
+    rgb = _NAMED_COLORS.get(color.lower())
+    if rgb is None:
+        raise ValueError(f"Неизвестный цвет: {color}")
+    return rgb
+
+
+@lru_cache(maxsize=16)
+def coverage_palette(color):
+    # 256 уровней покрытия; для каждого уровня по таблице на канал: новое значение по старому значению канала
+    palette = []
+    for level in range(256):
+        alpha = level / 255
+        palette.append(tuple(bytes(int(dst + (src - dst) * alpha + 0.5) for dst in range(256)) for src in color))
+    return tuple(palette)
+
+
+@lru_cache(maxsize=16)
+def coverage_table(color):
+    return np.array([[list(channel) for channel in level] for level in coverage_palette(color)], dtype=np.uint8)
+
+
+class FrameBuffer:
+
+    # left и top - координаты левого верхнего пикселя буфера: рисование идет в общих координатах сцены
+    def __init__(self, width, height, background="white", left=0, top=0):
+        self.width = width
+        self.height = height
+        self.left = left
+        self.top = top
+        self.background = parse_color(background)
+        self.pixels = bytearray(bytes(self.background) * (width * height))
+        self.on_update = None
+
+    def bounds(self):
+        # Прямоугольник отсечения (x_min, y_min, x_max, y_max) включительно
+        return self.left, self.top, self.left + self.width - 1, self.top + self.height - 1
+
+    def clear(self):
+        self.pixels[:] = bytes(self.background) * (self.width * self.height)
+
+    def put_pixel(self, x, y, color):
+        x -= self.left
+        y -= self.top
+        if 0 <= x < self.width and 0 <= y < self.height:
+            i = (y * self.width + x) * 3
+            self.pixels[i:i + 3] = bytes(color)
+
+    def get_pixel(self, x, y):
+        i = ((y - self.top) * self.width + x - self.left) * 3
+        return tuple(self.pixels[i:i + 3])
+
+    def fill_rect(self, x1, y1, x2, y2, color):
+        x1, x2 = max(0, x1 - self.left), min(self.width, x2 - self.left)
+        y1, y2 = max(0, y1 - self.top), min(self.height, y2 - self.top)
+        if x1 >= x2 or y1 >= y2:
+            return
+        row = bytes(color) * (x2 - x1)
+        for y in range(y1, y2):
+            start = (y * self.width + x1) * 3
+            self.pixels[start:start + len(row)] = row
+
+    def draw_pixels(self, pixels, color="black"):
+        color = parse_color(color)
+        for x, y in pixels:
+            self.put_pixel(x, y, color)
+
+    def draw_spans(self, spans, color="black"):
+        color = parse_color(color)
+        for xa, ya, xb, yb in spans:
+            self.fill_rect(xa, ya, xb + 1, yb + 1, color)
+
+    def draw_intensities(self, pixels, color="black"):
+        # Альфа-смешивание с текущим содержимым буфера через таблицы палитры, без вычислений цвета в цикле
+        palette = coverage_palette(parse_color(color))
+        buffer = self.pixels
+        width, height = self.width, self.height
+        left, top = self.left, self.top
+        for x, y, intensity in pixels:
+            x -= left
+            y -= top
+            if not (0 <= x < width and 0 <= y < height):
+                continue
+            level = int(intensity * 255 + 0.5)
+            if level <= 0:
+                continue
+            red, green, blue = palette[min(level, 255)]
+            i = (y * width + x) * 3
+            buffer[i] = red[buffer[i]]
+            buffer[i + 1] = green[buffer[i + 1]]
+            buffer[i + 2] = blue[buffer[i + 2]]
+
+    def put_pixels(self, xs, ys, color="black"):
+        if np is None:
+            self.draw_pixels(zip(xs, ys), color)
+            return
+        xs, ys, visible = self._visible(xs, ys)
+        self.as_array()[ys[visible], xs[visible]] = parse_color(color)
+
+    def put_intensities(self, xs, ys, intensities, color="black"):
+        if np is None:
+            self.draw_intensities(zip(xs, ys, intensities), color)
+            return
+        xs, ys, visible = self._visible(xs, ys)
+        levels = np.clip(np.floor(np.asarray(intensities, dtype=float)[visible] * 255 + 0.5), 0, 255).astype(np.intp)
+        offsets = ys[visible] * self.width + xs[visible]
+        table = coverage_table(parse_color(color))
+        flat = self.as_array().reshape(-1, 3)
+        channels = np.arange(3)
+
+        # Пиксель, задетый несколько раз, смешивается последовательно: проходы по номеру повторного попадания
+        order = np.argsort(offsets, kind="stable")
+        offsets, levels = offsets[order], levels[order]
+        first = np.r_[True, offsets[1:] != offsets[:-1]]
+        group_start = np.maximum.accumulate(np.where(first, np.arange(len(offsets)), 0))
+        rank = np.arange(len(offsets)) - group_start
+        for r in range(int(rank.max()) + 1 if len(rank) else 0):
+            hit = rank == r
+            target = offsets[hit]
+            flat[target] = table[levels[hit, None], channels, flat[target]]
+
+    def as_array(self):
+        return np.frombuffer(self.pixels, dtype=np.uint8).reshape(self.height, self.width, 3)
+
+    def _visible(self, xs, ys):
+        xs = np.asarray(xs, dtype=np.int64) - self.left
+        ys = np.asarray(ys, dtype=np.int64) - self.top
+        return xs, ys, (xs >= 0) & (xs < self.width) & (ys >= 0) & (ys < self.height)
+
+    # Интерфейс, совместимый с tk.Canvas, чтобы алгоритмы могли рисовать в буфер без изменений
+    def create_rectangle(self, x1, y1, x2, y2, fill="black", **kwargs):
+        self.fill_rect(int(x1), int(y1), int(x2), int(y2), parse_color(fill))
+
+    def update(self):
+        if self.on_update is not None:
+            self.on_update()
+
+    def paste(self, other):
+        # Копирование другого буфера (например, отрисованного тайла) на его место в сцене
+        x, y = other.left - self.left, other.top - self.top
+        width = min(other.width, self.width - x)
+        for row in range(min(other.height, self.height - y)):
+            src = row * other.width * 3
+            dst = ((y + row) * self.width + x) * 3
+            self.pixels[dst:dst + width * 3] = other.pixels[src:src + width * 3]
+
+    def to_ppm(self):
+        header = f"P6 {self.width} {self.height} 255\n".encode("ascii")
+        return header + bytes(self.pixels)
+
+    def to_png(self):
+        def chunk(kind, data):
+            return struct.pack(">I", len(data)) + kind + data + struct.pack(">I", zlib.crc32(kind + data))
+
+        stride = self.width * 3
+        raw = b"".join(b"\x00" + bytes(self.pixels[y * stride:(y + 1) * stride]) for y in range(self.height))
+        header = struct.pack(">IIBBBBB", self.width, self.height, 8, 2, 0, 0, 0)
+        return (b"\x89PNG\r\n\x1a\n" + chunk(b"IHDR", header) + chunk(b"IDAT", zlib.compress(raw, 6))
+                + chunk(b"IEND", b""))
+
+    def blit(self, photo):
+        photo.configure(data=self.to_ppm(), format="PPM")
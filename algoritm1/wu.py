@@ -1,6 +1,15 @@
 import math
 import time
 
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+from algoritm1.batch import as_segments, ramp, visible_steps
+from algoritm1.cache import cached_pixels, shifted_pattern
+from algoritm1.clipping import contains
+
 
 def _ipart(x):
     return math.floor(x)
@@ -29,7 +38,31 @@ def _plot(canvas, x, y, intensity, debug=False):
         time.sleep(0.05)
 
 
-def draw_line(canvas, x0, y0, x1, y1, debug=False):
+def pixels(x0, y0, x1, y1, clip=None):
+    stream = _pixels(x0, y0, x1, y1, clip)
+    if clip is None:
+        return stream
+    return ((x, y, intensity) for x, y, intensity in stream if contains(clip, x, y))
+
+
+def _interior_range(first, last, xpixel1, yend, gradient, steep, clip):
+    # Отсечение по главной оси до входа в цикл. Концы отрезка не переносятся на границу,
+    # поэтому сглаживание у края области вывода остается таким же, как без отсечения
+    major_min, major_max = (clip[1], clip[3]) if steep else (clip[0], clip[2])
+    minor_min, minor_max = (clip[0], clip[2]) if steep else (clip[1], clip[3])
+    first = max(first, major_min)
+    last = min(last, major_max)
+    if gradient != 0:
+        xa = xpixel1 + (minor_min - 1 - yend) / gradient
+        xb = xpixel1 + (minor_max + 1 - yend) / gradient
+        first = max(first, math.floor(min(xa, xb)) - 1)
+        last = min(last, math.ceil(max(xa, xb)) + 1)
+    elif not minor_min - 1 <= _ipart(yend) <= minor_max:
+        return first, first - 1
+    return first, last
+
+
+def _pixels(x0, y0, x1, y1, clip):
     steep = abs(y1 - y0) > abs(x1 - x0)
 
     if steep:
@@ -51,13 +84,13 @@ def draw_line(canvas, x0, y0, x1, y1, debug=False):
     ypixel1 = _ipart(yend)
 
     if steep:
-        _plot(canvas, ypixel1, xpixel1, _rfpart(yend) * xgap, debug)
-        _plot(canvas, ypixel1 + 1, xpixel1, _fpart(yend) * xgap, debug)
+        yield ypixel1, xpixel1, _rfpart(yend) * xgap
+        yield ypixel1 + 1, xpixel1, _fpart(yend) * xgap
     else:
-        _plot(canvas, xpixel1, ypixel1, _rfpart(yend) * xgap, debug)
-        _plot(canvas, xpixel1, ypixel1 + 1, _fpart(yend) * xgap, debug)
+        yield xpixel1, ypixel1, _rfpart(yend) * xgap
+        yield xpixel1, ypixel1 + 1, _fpart(yend) * xgap
 
-    intery = yend + gradient
+    ystart = yend
     xend = _round(x1)
     yend = y1 + gradient * (xend - x1)
     xgap = _fpart(x1 + 0.5)
@@ -65,23 +98,125 @@ def draw_line(canvas, x0, y0, x1, y1, debug=False):
     ypixel2 = _ipart(yend)
 
     if steep:
-        _plot(canvas, ypixel2, xpixel2, _rfpart(yend) * xgap, debug)
-        _plot(canvas, ypixel2 + 1, xpixel2, _fpart(yend) * xgap, debug)
+        yield ypixel2, xpixel2, _rfpart(yend) * xgap
+        yield ypixel2 + 1, xpixel2, _fpart(yend) * xgap
     else:
-        _plot(canvas, xpixel2, ypixel2, _rfpart(yend) * xgap, debug)
-        _plot(canvas, xpixel2, ypixel2 + 1, _fpart(yend) * xgap, debug)
+        yield xpixel2, ypixel2, _rfpart(yend) * xgap
+        yield xpixel2, ypixel2 + 1, _fpart(yend) * xgap
+
+    # Точка пересечения считается от начала отрезка, а не накоплением, поэтому отсечение не меняет пиксели
+    first, last = xpixel1 + 1, xpixel2 - 1
+    if clip is not None:
+        first, last = _interior_range(first, last, xpixel1, ystart, gradient, steep, clip)
 
     if steep:
-        for x in range(xpixel1 + 1, xpixel2):
+        for x in range(first, last + 1):
+            intery = ystart + gradient * (x - xpixel1)
             y = _ipart(intery)
-            _plot(canvas, y, x, _rfpart(intery), debug)
-            _plot(canvas, y + 1, x, _fpart(intery), debug)
-            intery += gradient
+            yield y, x, _rfpart(intery)
+            yield y + 1, x, _fpart(intery)
     else:
-        for x in range(xpixel1 + 1, xpixel2):
+        for x in range(first, last + 1):
+            intery = ystart + gradient * (x - xpixel1)
             y = _ipart(intery)
-            _plot(canvas, x, y, _rfpart(intery), debug)
-            _plot(canvas, x, y + 1, _fpart(intery), debug)
-            intery += gradient
+            yield x, y, _rfpart(intery)
+            yield x, y + 1, _fpart(intery)
+
+
+def _translation_safe(dx, dy):
+    # Точка пересечения не попадает точно на целое при наклоне, не представимом точно в double:
+    # там floor() решает погрешность, а она зависит от положения отрезка. Так же и покрытие вида
+    # m / period с четным period может попасть точно на середину между уровнями яркости (m * 255 / period + 0.5
+    # целое), и уровень тогда зависит от погрешности. Наклон со знаменателем 2^k вычисляется точно
+    major, minor = max(abs(dx), abs(dy)), min(abs(dx), abs(dy))
+    if minor == 0:
+        return True
+    period = major // math.gcd(major, minor)
+    return period & (period - 1) == 0 or (period == major and period % 2 == 1)
+
 
+def cached_columns(x0, y0, x1, y1):
+    # Пиксели отрезка столбцами из кэша узоров (algoritm1.cache) или None, если отрезок не кэшируется
+    return shifted_pattern(pixels, x0, y0, x1, y1, _translation_safe)
 
+
+def draw_line(canvas, x0, y0, x1, y1, debug=False, clip=None):
+    for x, y, intensity in cached_pixels(pixels, x0, y0, x1, y1, clip, _translation_safe):
+        _plot(canvas, x, y, intensity, debug)
+
+
+def draw_lines(segments, clip=None):
+    # clip - как в pixels(): концы рисуются всегда, внутренние точки - только рядом с прямоугольником
+    if np is None:
+        return _draw_lines_python(segments, clip)
+
+    segments = as_segments(segments)
+    x0, y0, x1, y1 = segments.T.copy()
+
+    steep = np.abs(y1 - y0) > np.abs(x1 - x0)
+    x0[steep], y0[steep] = y0[steep], x0[steep]
+    x1[steep], y1[steep] = y1[steep], x1[steep]
+
+    backward = x0 > x1
+    x0[backward], x1[backward] = x1[backward], x0[backward]
+    y0[backward], y1[backward] = y1[backward], y0[backward]
+
+    dx = x1 - x0
+    dy = y1 - y0
+    gradient = np.divide(dy, dx, out=np.ones_like(dx), where=dx != 0)
+
+    xend1 = np.floor(x0 + 0.5)
+    yend1 = y0 + gradient * (xend1 - x0)
+    xgap1 = 1 - _fpart_array(x0 + 0.5)
+    xend2 = np.floor(x1 + 0.5)
+    yend2 = y1 + gradient * (xend2 - x1)
+    xgap2 = _fpart_array(x1 + 0.5)
+
+    # Концевые точки: по две точки на каждый конец отрезка
+    major = [xend1, xend1, xend2, xend2]
+    minor = [np.floor(yend1), np.floor(yend1) + 1, np.floor(yend2), np.floor(yend2) + 1]
+    coverage = [(1 - _fpart_array(yend1)) * xgap1, _fpart_array(yend1) * xgap1,
+                (1 - _fpart_array(yend2)) * xgap2, _fpart_array(yend2) * xgap2]
+    flags = [steep] * 4
+
+    # Внутренние точки между концами
+    counts = np.maximum(xend2 - xend1 - 1, 0).astype(np.int64)
+    first = np.zeros_like(counts)
+    if clip is not None:
+        # Отсечение в координатах с главной осью x; Ву закрашивает и соседнюю строку, отсюда запас в два пикселя
+        x_min, y_min, x_max, y_max = clip
+        swapped = (np.where(steep, y_min, x_min), np.where(steep, x_min, y_min),
+                   np.where(steep, y_max, x_max), np.where(steep, x_max, y_max))
+        first, last = visible_steps(xend1, yend1, xend2, yend2, xend2 - xend1, swapped, margin=2)
+        first = np.maximum(first - 1, 0)  # Внутренняя точка i - это шаг i + 1 от первого конца
+        counts = np.maximum(np.minimum(last - 1, counts - 1) - first + 1, 0)
+    i, owners = ramp(counts)
+    i = i + first[owners]
+    intery = yend1[owners] + gradient[owners] * (i + 1)
+    inner_major = xend1[owners] + 1 + i
+    inner_minor = np.floor(intery)
+    major += [inner_major, inner_major]
+    minor += [inner_minor, inner_minor + 1]
+    coverage += [1 - _fpart_array(intery), _fpart_array(intery)]
+    flags += [steep[owners]] * 2
+
+    major = np.concatenate(major)
+    minor = np.concatenate(minor)
+    flags = np.concatenate(flags)
+    xs = np.where(flags, minor, major).astype(np.int64)
+    ys = np.where(flags, major, minor).astype(np.int64)
+    return xs, ys, np.concatenate(coverage)
+
+
+def _fpart_array(x):
+    return x - np.floor(x)
+
+
+def _draw_lines_python(segments, clip=None):
+    xs, ys, coverage = [], [], []
+    for x0, y0, x1, y1 in segments:
+        for x, y, intensity in pixels(x0, y0, x1, y1, clip):
+            xs.append(x)
+            ys.append(y)
+            coverage.append(intensity)
+    return xs, ys, coverage
@@ -0,0 +1,258 @@
+"""Бенчмарк алгоритмов растеризации без дисплея.
+
+Отрезки (algoritm1), фигуры PaintApp из 2lab.py и кривые CurveEditor из 3lab.py
+рисуются на записывающую заглушку холста. Результаты сохраняются в JSON:
+точек в секунду, вызовов Tk на примитив и пиковая память.
+
+    python benchmark.py --output benchmark.json
+"""
+import argparse
+import importlib.util
+import itertools
+import json
+import math
+import os
+import platform
+import sys
+import time
+import tracemalloc
+from collections import Counter
+
+import algoritm1.bresenham as bresenham
+import algoritm1.cache as line_cache
+import curves
+import algoritm1.dda as dda
+import algoritm1.wu as wu
+from algoritm1.framebuffer import FrameBuffer
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+
+
+class RecordingCanvas:
+    """Заглушка tk.Canvas: ничего не рисует, только считает вызовы."""
+
+    def __init__(self):
+        self.calls = Counter()
+        self.vertices = 0  # Вершин в переданных координатах линий
+        self._next_id = 0
+
+    def _create(self, kind):
+        self.calls[kind] += 1
+        self._next_id += 1
+        return self._next_id
+
+    def create_rectangle(self, *args, **kwargs):
+        return self._create("create_rectangle")
+
+    def create_oval(self, *args, **kwargs):
+        return self._create("create_oval")
+
+    def create_line(self, *args, **kwargs):
+        self.vertices += len(args) // 2
+        return self._create("create_line")
+
+    def coords(self, item, *args):
+        self.vertices += len(args) // 2
+        self.calls["coords"] += 1
+
+    def delete(self, *args):
+        self.calls["delete"] += 1
+
+    def update(self):
+        self.calls["update"] += 1
+
+    def total(self):
+        return sum(self.calls.values())
+
+
+def load_script(name, filename):
+    # 2lab.py и 3lab.py нельзя импортировать обычным import из-за имени файла
+    spec = importlib.util.spec_from_file_location(name, os.path.join(ROOT, filename))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def headless(app_class, canvas, **attributes):
+    # Экземпляр приложения без создания окна Tk: задаются только поля, нужные алгоритмам
+    app = app_class.__new__(app_class)
+    app.tk = None
+    app.canvas = canvas
+    for name, value in attributes.items():
+        setattr(app, name, value)
+    return app
+
+
+def measure(run, repeat):
+    """Лучшее время из repeat запусков и пиковая память отдельного запуска под tracemalloc.
+
+    Кэш узоров отрезков очищается перед каждым запуском: иначе повторы мерили бы только попадания в кэш.
+    """
+    best = math.inf
+    result = None
+    for _ in range(repeat):
+        line_cache.cache_clear()
+        start = time.perf_counter()
+        result = run()
+        best = min(best, time.perf_counter() - start)
+    line_cache.cache_clear()
+    tracemalloc.start()
+    run()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return best, peak, result
+
+
+def record(results, group, name, params, seconds, peak, points, canvas=None, primitives=1):
+    entry = {
+        "group": group,
+        "name": name,
+        "params": params,
+        "seconds": seconds,
+        "points": points,
+        "points_per_second": points / seconds if seconds > 0 else None,
+        "tk_calls_per_primitive": canvas.total() / primitives if canvas is not None else 0,
+        "peak_memory_bytes": peak,
+    }
+    results.append(entry)
+    print(f"{group:8} {name:28} {json.dumps(params):42} {entry['points_per_second'] or 0:14.0f} pts/s "
+          f"{entry['tk_calls_per_primitive']:10.1f} tk/prim {peak / 1024:10.1f} KiB")
+
+
+def line_endpoints(length, angle):
+    x1 = round(length * math.cos(math.radians(angle)))
+    y1 = round(length * math.sin(math.radians(angle)))
+    return 0, 0, x1, y1
+
+
+def bench_lines(results, lengths, angles, repeat):
+    algorithms = {"dda": dda, "bresenham": bresenham, "wu": wu}
+    for length in lengths:
+        for angle in angles:
+            segment = line_endpoints(length, angle)
+            params = {"length": length, "angle": angle}
+            for name, module in algorithms.items():
+                def on_canvas(module=module):
+                    canvas = RecordingCanvas()
+                    module.draw_line(canvas, *segment)
+                    return canvas
+
+                seconds, peak, canvas = measure(on_canvas, repeat)
+                points = sum(1 for _ in module.pixels(*segment))
+                record(results, "line", f"{name}.draw_line", params, seconds, peak, points, canvas)
+
+                seconds, peak, _ = measure(lambda module=module: sum(1 for _ in module.pixels(*segment)), repeat)
+                record(results, "line", f"{name}.pixels", params, seconds, peak, points)
+
+                framebuffer = FrameBuffer(2 * length + 1, 2 * length + 1)
+                shifted = [c + length for c in segment]
+                if module is wu:
+                    def to_buffer():
+                        framebuffer.draw_intensities(wu.pixels(*shifted))
+                elif module is bresenham:
+                    def to_buffer():
+                        framebuffer.draw_spans(bresenham.spans(*shifted))
+                else:
+                    def to_buffer(module=module):
+                        framebuffer.draw_pixels(module.pixels(*shifted))
+                seconds, peak, _ = measure(to_buffer, repeat)
+                record(results, "line", f"{name}.framebuffer", params, seconds, peak, points)
+
+
+def bench_batch(results, counts, repeat):
+    for count in counts:
+        segments = [line_endpoints(20 + i % 80, (i * 7) % 360) for i in range(count)]
+        params = {"segments": count}
+        for name, module in {"dda": dda, "bresenham": bresenham, "wu": wu}.items():
+            seconds, peak, arrays = measure(lambda module=module: module.draw_lines(segments), repeat)
+            record(results, "batch", f"{name}.draw_lines", params, seconds, peak, len(arrays[0]))
+
+
+def bench_figures(results, radii, repeat):
+    lab2 = load_script("lab2", "2lab.py")
+    # Тот же путь, что у щелчка в PaintApp: точки figure_points выводятся через _draw_batch
+    # (в приложении точки считает RasterWorker, здесь - тот же поток)
+    figures = {
+        "circle": ("Окружность", lambda r: (r, 0)),
+        "ellipse": ("Эллипс", lambda r: (r, max(1, r // 2))),
+        "hyperbola": ("Гипербола", lambda r: (max(1, r // 4), max(1, r // 8))),
+        "parabola": ("Парабола", lambda r: (max(1, r // 4), 0)),
+    }
+    for radius in radii:
+        for name, (kind, sizes) in figures.items():
+            def run(kind=kind, sizes=sizes):
+                canvas = RecordingCanvas()
+                app = headless(lab2.PaintApp, canvas, is_debugging=False, selected_color="black",
+                               selected_figure=kind, debug_pause=0, draw_area_width=600, draw_area_height=400)
+                app._draw_batch(app.figure_points(kind, 300, 200, *sizes(radius)))
+                return canvas
+
+            seconds, peak, canvas = measure(run, repeat)
+            record(results, "figure", f"PaintApp.{name}", {"radius": radius}, seconds, peak,
+                   canvas.calls["create_oval"], canvas)
+
+
+def bench_curves(results, point_counts, repeat):
+    lab3 = load_script("lab3", "3lab.py")
+    for curve_type, tolerance in itertools.product(("Эрмит", "Безье", "B-сплайн"), (None, curves.TOLERANCE)):
+        for count in point_counts:
+            # Эрмит и Безье: count / 4 отдельных кривых, B-сплайн: одна замкнутая кривая из count точек
+            app = headless(lab3.CurveEditor, RecordingCanvas(), current_curve_type=curve_type, tolerance=tolerance)
+            app.reset_document()
+            for i in range(count):
+                app.add_point(300 + 200 * math.cos(2 * math.pi * i / count),
+                              300 + 200 * math.sin(2 * math.pi * i / count))
+            params = {"control_points": count, "tolerance": tolerance}
+
+            def redraw():
+                app.canvas = RecordingCanvas()
+                app.draw_curve()
+                return app.canvas
+
+            seconds, peak, canvas = measure(redraw, repeat)
+            record(results, "curve", f"CurveEditor[{curve_type}]", params, seconds, peak, canvas.vertices, canvas,
+                   primitives=max(1, len(app.curve_lines)))
+
+            def drag():
+                app.canvas = RecordingCanvas()
+                points = app.document.points
+                app.move_point(0, points.x[0] + 1, points.y[0])
+                return app.canvas
+
+            seconds, peak, canvas = measure(drag, repeat)
+            record(results, "curve", f"CurveEditor[{curve_type}].drag", params, seconds, peak, canvas.vertices, canvas)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Бенчмарк алгоритмов растеризации без дисплея")
+    parser.add_argument("--output", default="benchmark.json", help="файл для результатов в формате JSON")
+    parser.add_argument("--repeat", type=int, default=3, help="число повторов, берется лучшее время")
+    parser.add_argument("--quick", action="store_true", help="сокращенный набор размеров")
+    args = parser.parse_args(argv)
+
+    if args.quick:
+        lengths, angles, batch, radii, point_counts = [50], [0, 30, 45, 80], [100], [50], [8]
+    else:
+        lengths, angles = [10, 100, 1000], [0, 15, 30, 45, 60, 75, 90]
+        batch, radii, point_counts = [100, 1000, 10000], [10, 50, 200], [4, 16, 64, 4096]
+
+    results = []
+    bench_lines(results, lengths, angles, args.repeat)
+    bench_batch(results, batch, args.repeat)
+    bench_figures(results, radii, args.repeat)
+    bench_curves(results, point_counts, args.repeat)
+
+    report = {
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "repeat": args.repeat,
+        "results": results,
+    }
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f"Результаты сохранены в {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,196 @@
+"""Рандомизированные проверки эквивалентности быстрых путей растеризации.
+
+Замкнутые формулы и векторные версии сравниваются с простыми генераторами,
+от которых они выведены: отсечение - с фильтрацией неотсеченного отрезка,
+draw_lines - с pixels(), векторные лестницы кривых второго порядка - с их
+пошаговыми генераторами, перенесенные узоры кэша - с прямым вычислением
+отрезка на месте. Запускается без дисплея; при расхождении печатает
+первые несовпавшие случаи и завершается с кодом 1.
+
+    python checks.py --cases 2000 --seed 1
+"""
+import argparse
+import math
+import random
+import sys
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+import algoritm1.bresenham as bresenham
+import algoritm1.dda as dda
+import algoritm1.cache as line_cache
+import algoritm1.wu as wu
+import conics
+from algoritm1.clipping import contains
+
+LINES = {"dda": dda, "bresenham": bresenham, "wu": wu}
+SHOWN = 5  # Сколько несовпавших случаев печатать на проверку
+
+
+def level(intensity):
+    # Уровень яркости, как его пишет буфер кадра: сравниваются уровни, а не сами доли покрытия
+    return math.floor(intensity * 255 + 0.5)
+
+
+def as_levels(pixels):
+    return [(pixel[0], pixel[1], level(pixel[2])) if len(pixel) > 2 else tuple(pixel) for pixel in pixels]
+
+
+def random_segment(rng, module, span=60):
+    # Концы целые; у ЦДА еще и половинные, на них округление попадает точно на середину пикселя
+    def coordinate():
+        value = rng.randint(-span, span)
+        return value + 0.5 if module is dda and rng.random() < 0.3 else value
+
+    x0, y0 = coordinate(), coordinate()
+    if rng.random() < 0.2:  # Горизонтальные, вертикальные и диагональные отрезки - отдельные ветви кода
+        length = rng.randint(0, span)
+        dx, dy = rng.choice(((length, 0), (0, length), (length, length), (length, -length)))
+        return x0, y0, x0 + dx, y0 + dy
+    return x0, y0, coordinate(), coordinate()
+
+
+def random_clip(rng, span=60):
+    x_min, y_min = rng.randint(-span, span), rng.randint(-span, span)
+    return x_min, y_min, x_min + rng.randint(0, span), y_min + rng.randint(0, span)
+
+
+def check_clipping(rng, cases):
+    # pixels(clip) - те же пиксели в том же порядке, что pixels() с отброшенными невидимыми
+    failures = []
+    for name, module in LINES.items():
+        for _ in range(cases):
+            segment, clip = random_segment(rng, module), random_clip(rng)
+            clipped = list(module.pixels(*segment, clip))
+            expected = [pixel for pixel in module.pixels(*segment) if contains(clip, pixel[0], pixel[1])]
+            if clipped != expected:
+                failures.append(f"{name}.pixels{segment} clip={clip}")
+    return failures
+
+
+def check_spans(rng, cases):
+    # Серии Брезенхема покрывают ровно пиксели pixels(), с отсечением и без
+    failures = []
+    for _ in range(cases):
+        segment, clip = random_segment(rng, bresenham), rng.choice((None, random_clip(rng)))
+        covered = set()
+        for xa, ya, xb, yb in bresenham.spans(*segment, clip):
+            covered.update((x, y) for x in range(xa, xb + 1) for y in range(ya, yb + 1))
+        if covered != set(bresenham.pixels(*segment, clip)):
+            failures.append(f"bresenham.spans{segment} clip={clip}")
+    return failures
+
+
+def check_draw_lines(rng, cases):
+    # draw_lines пакета отрезков - те же пиксели, что pixels() каждого отрезка; с clip сравниваются видимые
+    if np is None:
+        return None
+    failures = []
+    for name, module in LINES.items():
+        for _ in range(max(1, cases // 10)):
+            segments = [random_segment(rng, module) for _ in range(rng.randint(1, 20))]
+            if module is bresenham:
+                segments = [tuple(int(v) for v in segment) for segment in segments]
+            clip = rng.choice((None, random_clip(rng)))
+            columns = module.draw_lines(segments, clip)
+            batch = as_levels(zip(*(column.tolist() for column in columns)))
+            expected = as_levels(pixel for segment in segments for pixel in module.pixels(*segment))
+            if clip is not None:
+                batch = [pixel for pixel in batch if contains(clip, pixel[0], pixel[1])]
+                expected = [pixel for pixel in expected if contains(clip, pixel[0], pixel[1])]
+            if sorted(batch) != sorted(expected):
+                failures.append(f"{name}.draw_lines({segments}) clip={clip}")
+    return failures
+
+
+def check_conics(rng, cases):
+    # *_array (двоичный поиск порогов и накопленный минимум) - те же точки в том же порядке, что генераторы
+    if np is None:
+        return None
+    failures = []
+    for _ in range(max(1, cases // 20)):
+        a, b = rng.randint(1, 1500), rng.randint(1, 1500)
+        x_limit, y_limit = rng.randint(0, 2000), rng.randint(0, 2000)
+        p = rng.choice((-1, 1)) * rng.randint(1, 500)
+        sign = -1 if p > 0 else 1
+        figures = {
+            f"circle({a})": (conics.circle_array(a), conics._mirror(conics._circle_octant(a), conics._octants)),
+            f"ellipse({a}, {b})": (conics.ellipse_array(a, b),
+                                   conics._mirror(conics._ellipse_quadrant(a, b), conics._quadrants)),
+            f"hyperbola({a}, {b}, {x_limit}, {y_limit})": (
+                conics.hyperbola_array(a, b, x_limit, y_limit),
+                conics._mirror(conics._hyperbola_quadrant(a, b, x_limit, y_limit), conics._quadrants)),
+            f"parabola({p}, {x_limit}, {y_limit})": (
+                conics.parabola_array(p, x_limit, y_limit),
+                conics._mirror(conics._parabola_half(abs(p), x_limit, y_limit),
+                               lambda x, y: ((x, sign * y), (-x, sign * y)))),
+        }
+        for name, (vectorized, stepwise) in figures.items():
+            if [column.tolist() for column in vectorized] != [list(column) for column in stepwise]:
+                failures.append(f"conics.{name}")
+    return failures
+
+
+def check_cache(rng, cases):
+    # Узор из кэша, перенесенный в начало отрезка, - те же пиксели и уровни, что pixels() на месте.
+    # Формы, которые _translation_safe пропускает, обязаны совпадать и вдали от начала координат
+    failures = []
+    line_cache.cache_clear()
+    for name, module in LINES.items():
+        cached = 0
+        for _ in range(cases):
+            span = rng.choice((24, 600))
+            dx, dy = rng.randint(-span, span), rng.randint(-span, span)
+            x0, y0 = rng.randint(-(1 << 19), 1 << 19), rng.randint(-(1 << 19), 1 << 19)
+            columns = module.cached_columns(x0, y0, x0 + dx, y0 + dy)
+            if columns is None:
+                continue
+            cached += 1
+            pattern = list(zip(*(column.tolist() if np is not None else column for column in columns)))
+            if as_levels(pattern) != as_levels(module.pixels(x0, y0, x0 + dx, y0 + dy)):
+                failures.append(f"{name}.cached_columns({x0}, {y0}, {x0 + dx}, {y0 + dy})")
+            clip = (x0 - span // 2, y0 - span // 2, x0 + span // 2, y0 + span // 2)
+            through_cache = line_cache.cached_pixels(module.pixels, x0, y0, x0 + dx, y0 + dy, clip)
+            if list(through_cache) != list(module.pixels(x0, y0, x0 + dx, y0 + dy, clip)):
+                failures.append(f"{name}.cached_pixels({x0}, {y0}, {x0 + dx}, {y0 + dy}) clip={clip}")
+        if not cached:
+            failures.append(f"{name}: ни один отрезок не взят из кэша")
+    line_cache.cache_clear()
+    return failures
+
+
+CHECKS = {
+    "clipping": check_clipping,
+    "bresenham.spans": check_spans,
+    "draw_lines": check_draw_lines,
+    "conics": check_conics,
+    "cache": check_cache,
+}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Проверки эквивалентности алгоритмов растеризации")
+    parser.add_argument("--cases", type=int, default=2000, help="случаев на проверку и алгоритм")
+    parser.add_argument("--seed", type=int, default=1, help="начальное значение генератора случайных чисел")
+    args = parser.parse_args(argv)
+
+    failed = False
+    for name, check in CHECKS.items():
+        failures = check(random.Random(args.seed), args.cases)
+        if failures is None:
+            print(f"{name:24} пропущено (нет NumPy)")
+        elif failures:
+            failed = True
+            print(f"{name:24} расхождений: {len(failures)}")
+            for failure in failures[:SHOWN]:
+                print(f"    {failure}")
+        else:
+            print(f"{name:24} ok")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,346 @@
+"""Растеризация кривых второго порядка для 2lab.py.
+
+Все фигуры строятся одним способом: генератор проходит одну четверть (для
+окружности - одну восьмую) кривой в обеих областях наклона с целочисленными
+решающими переменными, которые обновляются прямыми разностями, а общий этап
+симметрии отражает найденные точки в остальные части кривой.
+
+Точки фигуры зависят только от ее размеров, поэтому таблицы смещений
+кэшируются; рисование фигуры сводится к переносу таблицы в точку щелчка.
+Кэш ограничен, давно не использованные размеры вытесняются (LRU).
+
+Для больших фигур при наличии NumPy таблица строится векторно (*_array):
+точки совпадают с генераторами поштучно и в том же порядке.
+"""
+from array import array
+from functools import lru_cache
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+CACHE_SIZE = 128
+VECTORIZE_FROM = 256 # С какого размера фигуры точки считаются векторно (если есть NumPy)
+VECTORIZE_UP_TO = 20000 # Выше решающие переменные могут не поместиться в int64
+
+
+def _circle_octant(radius):
+    x, y, delta = 0, radius, 3 - 2 * radius # дельта для контроля изменения координаты y
+    while x <= y:
+        yield x, y
+        x += 1
+        if delta > 0: # Если delta больше 0, уменьшаем y и обновляем delta
+            y -= 1
+            delta += 4 * (x - y) + 10
+        else:
+            delta += 4 * x + 6
+
+
+def _ellipse_quadrant(a, b):
+    # Решающие переменные умножены на 4, чтобы избавиться от 0.25 и 0.5 средней точки
+    a2, b2 = a * a, b * b
+    x, y = 0, b
+    step_x, step_y = 0, 2 * a2 * y # 2b²x и 2a²y, обновляются сложением
+    d1 = 4 * b2 - 4 * a2 * b + a2
+    while 2 * a2 * y - a2 > 2 * b2 * (x + 1): # Область 1: наклон меньше 1, шаг по x
+        yield x, y
+        x += 1
+        step_x += 2 * b2
+        if d1 < 0:
+            d1 += 4 * (step_x + b2)
+        else:
+            y -= 1
+            step_y -= 2 * a2
+            d1 += 4 * (step_x - step_y + b2)
+    d2 = b2 * (2 * x + 1) ** 2 + 4 * a2 * (y - 1) ** 2 - 4 * a2 * b2
+    while y > 0: # Область 2: шаг по y
+        yield x, y
+        y -= 1
+        step_y -= 2 * a2
+        if d2 > 0:
+            d2 += 4 * (a2 - step_y)
+        else:
+            x += 1
+            step_x += 2 * b2
+            d2 += 4 * (step_x - step_y + a2)
+    # Нижняя строка проходится до конца полуоси: у вытянутого эллипса область 2 доходит до y = 0 раньше
+    for x in range(x, max(x, a) + 1):
+        yield x, 0
+
+
+def _hyperbola_quadrant(a, b, x_limit, y_limit):
+    # x и y вдоль ветви только растут, поэтому за x_limit или y_limit видимых точек больше нет.
+    # F(x, y) = b²x² - a²y² - a²b²: F < 0 между ветвями, F > 0 снаружи
+    a2, b2 = a * a, b * b
+    x, y = a, 0
+    step_x, step_y = 2 * b2 * x, 0 # 2b²x и 2a²y
+    d1 = b2 * (2 * x + 1) ** 2 - 4 * a2 - 4 * a2 * b2 # 4F(x + 0.5, y + 1)
+    while 2 * b2 * x - b2 > 2 * a2 * (y + 1) and x <= x_limit and y <= y_limit: # Область 1: шаг по y
+        yield x, y
+        y += 1
+        step_y += 2 * a2
+        if d1 < 0: # Средняя точка между ветвями - кривая правее, шаг и по x
+            x += 1
+            step_x += 2 * b2
+            d1 += 4 * (step_x - step_y - a2)
+        else:
+            d1 -= 4 * (step_y + a2)
+    d2 = 4 * b2 * (x + 1) ** 2 - a2 * (2 * y + 1) ** 2 - 4 * a2 * b2 # 4F(x + 1, y + 0.5)
+    while x <= x_limit and y <= y_limit: # Область 2: шаг по x
+        yield x, y
+        x += 1
+        step_x += 2 * b2
+        if d2 > 0: # Средняя точка снаружи - кривая выше, шаг и по y
+            y += 1
+            step_y += 2 * a2
+            d2 += 4 * (step_x - step_y + b2)
+        else:
+            d2 += 4 * (step_x + b2)
+
+
+def _parabola_half(p, x_limit, y_limit):
+    # Ветвь x² = 4py при p > 0. Область 1 (x < 2p, наклон меньше 1): шаг по x;
+    # область 2: шаг по y, поэтому на крутом участке нет разрывов
+    x, y = 0, 0
+    d = 1 - 2 * p # (x + 1)² - 4p(y + 0.5) в средней точке
+    while x < 2 * p and x <= x_limit and y <= y_limit:
+        yield x, y
+        x += 1
+        if d > 0:
+            y += 1
+            d += 2 * x + 1 - 4 * p
+        else:
+            d += 2 * x + 1
+    d = (2 * x + 1) ** 2 - 16 * p * (y + 1) # 4 * [(x + 0.5)² - 4p(y + 1)]
+    while x <= x_limit and y <= y_limit:
+        yield x, y
+        y += 1
+        if d < 0:
+            x += 1
+            d += 8 * x - 16 * p
+        else:
+            d -= 16 * p
+
+
+def _mirror(points, reflections):
+    # Общий этап симметрии: каждая точка отражается, совпадающие на осях отражения пропускаются
+    xs, ys = array("i"), array("i")
+    for x, y in points:
+        seen = set()
+        for dx, dy in reflections(x, y):
+            if (dx, dy) not in seen:
+                seen.add((dx, dy))
+                xs.append(dx)
+                ys.append(dy)
+    return xs, ys
+
+
+def _octants(x, y):
+    return (x, y), (y, x), (-y, x), (-x, y), (-x, -y), (-y, -x), (y, -x), (x, -y)
+
+
+def _quadrants(x, y):
+    return (x, y), (-x, y), (x, -y), (-x, -y)
+
+
+# Векторный режим. Каждая область кривой - "лестница": по главной оси шаг всегда, по второй оси
+# шаг на 1, если решающая переменная (функция текущей точки) разрешает. Для каждого шага по главной
+# оси порог второй оси находится целочисленным двоичным поиском по всем шагам сразу, после чего
+# лестница восстанавливается накопленным минимумом - с тем же округлением, что и у генераторов выше.
+
+def _last_true(predicate, low, high):
+    # Наибольшее n из [low, high] с predicate(n) (предикат истинен, затем ложен) для каждого элемента
+    low = np.asarray(low, dtype=np.int64) - 1
+    high = np.asarray(high, dtype=np.int64) + 1
+    while True:
+        open_ = high - low > 1
+        if not open_.any():
+            return low
+        middle = (low + high) // 2
+        hit = predicate(middle)
+        low = np.where(open_ & hit, middle, low)
+        high = np.where(open_ & ~hit, middle, high)
+
+
+def _staircase(start, thresholds):
+    # Значения второй оси для шагов 0..n: v(0) = start, v(m + 1) = v(m) + [v(m) <= thresholds[m]].
+    # Пороги не убывают, поэтому v(m) = m + min по k <= m от (T(k) - k), T(k) = max(start, thresholds[k - 1] + 1)
+    targets = np.concatenate(([start], np.maximum(start, thresholds + 1)))
+    steps = np.arange(len(targets))
+    return steps + np.minimum.accumulate(targets - steps)
+
+
+def _prefix(condition):
+    # Длина начального участка, на котором условие цикла выполняется
+    failed = np.flatnonzero(~condition)
+    return failed[0] if len(failed) else len(condition)
+
+
+def _circle_octant_array(radius):
+    # delta = 2x² + 8x + 2y² - 6y + c, y уменьшается, если delta > 0 (возрастает по y при y >= 2)
+    c = 3 + 4 * radius - 2 * radius * radius
+    x = np.arange(radius + 1, dtype=np.int64)
+
+    def delta(xv, yv):
+        return 2 * xv * xv + 8 * xv + 2 * yv * yv - 6 * yv + c
+
+    limit = _last_true(lambda n: delta(x, -n) > 0, -radius, -2) # -min y с delta > 0
+    y = -_staircase(-radius, limit)[:len(x)]
+    count = _prefix(x <= y)
+    return x[:count], y[:count]
+
+
+def _ellipse_quadrant_array(a, b):
+    a2, b2 = a * a, b * b
+    x = np.arange(a + 1, dtype=np.int64)
+    # Область 1: 4F(x + 1, y - 0.5) >= 0 - шаг вниз по y
+    limit = _last_true(lambda n: 4 * b2 * (x + 1) ** 2 + a2 * (-2 * n - 1) ** 2 - 4 * a2 * b2 >= 0, -b, 0)
+    y = -_staircase(-b, limit)[:len(x)]
+    count = _prefix(2 * a2 * y - a2 > 2 * b2 * (x + 1))
+    x1, y1 = x[:count], y[:count]
+    start_x = int(x[count]) if count < len(x) else a
+    start_y = int(y[count]) if count < len(x) else 0
+
+    # Область 2: строки от start_y до 1, 4F(x + 0.5, y - 1) <= 0 - шаг вправо по x;
+    # нижняя строка y = 0 - от найденного x до конца полуоси
+    y2 = np.arange(start_y, -1, -1, dtype=np.int64)
+    limit = _last_true(lambda n: b2 * (2 * n + 1) ** 2 + 4 * a2 * (y2 - 1) ** 2 - 4 * a2 * b2 <= 0, start_x, a)
+    x2 = _staircase(start_x, limit)[:len(y2)]
+    x3 = np.arange(x2[-1], max(int(x2[-1]), a) + 1, dtype=np.int64)
+    return (np.concatenate((x1, x2[:-1], x3)),
+            np.concatenate((y1, y2[:-1], np.zeros(len(x3), dtype=np.int64))))
+
+
+def _hyperbola_quadrant_array(a, b, x_limit, y_limit):
+    a2, b2 = a * a, b * b
+    if a > x_limit:
+        return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+    # Область 1: строки y, 4F(x + 0.5, y + 1) < 0 - шаг вправо по x
+    y = np.arange(y_limit + 1, dtype=np.int64)
+    limit = _last_true(lambda n: b2 * (2 * n + 1) ** 2 - 4 * a2 * (y + 1) ** 2 - 4 * a2 * b2 < 0, a, x_limit + 1)
+    x = _staircase(a, limit)[:len(y)]
+    count = _prefix((2 * b2 * x - b2 > 2 * a2 * (y + 1)) & (x <= x_limit))
+    x1, y1 = x[:count], y[:count]
+    if count == len(y) or x[count] > x_limit:
+        return x1, y1
+    start_x, start_y = int(x[count]), int(y[count])
+
+    # Область 2: столбцы x, 4F(x + 1, y + 0.5) > 0 - шаг вверх по y
+    x2 = np.arange(start_x, x_limit + 1, dtype=np.int64)
+    limit = _last_true(lambda n: 4 * b2 * (x2 + 1) ** 2 - a2 * (2 * n + 1) ** 2 - 4 * a2 * b2 > 0, start_y, y_limit + 1)
+    y2 = _staircase(start_y, limit)[:len(x2)]
+    count = _prefix(y2 <= y_limit)
+    return np.concatenate((x1, x2[:count])), np.concatenate((y1, y2[:count]))
+
+
+def _parabola_half_array(p, x_limit, y_limit):
+    # Область 1: столбцы x < 2p, (x + 1)² - 4p(y + 0.5) > 0 - шаг по y
+    x = np.arange(min(2 * p, x_limit + 1) + 1, dtype=np.int64)
+    limit = _last_true(lambda n: 2 * (x + 1) ** 2 - 4 * p * (2 * n + 1) > 0, 0, y_limit + 1)
+    y = _staircase(0, limit)[:len(x)]
+    count = _prefix((x < 2 * p) & (x <= x_limit) & (y <= y_limit))
+    x1, y1 = x[:count], y[:count]
+    start_x, start_y = int(x[count]), int(y[count])
+
+    # Область 2: строки y, (2x + 1)² - 16p(y + 1) < 0 - шаг по x
+    y2 = np.arange(start_y, y_limit + 1, dtype=np.int64)
+    limit = _last_true(lambda n: (2 * n + 1) ** 2 - 16 * p * (y2 + 1) < 0, start_x, x_limit + 1)
+    x2 = _staircase(start_x, limit)[:len(y2)]
+    count = _prefix(x2 <= x_limit)
+    return np.concatenate((x1, x2[:count])), np.concatenate((y1, y2[:count]))
+
+
+def _mirror_array(xs, ys, reflections):
+    # Векторный аналог _mirror: те же отражения в том же порядке, совпадающие точки пропускаются
+    points = np.stack([np.stack((sx * xs if not swap else sx * ys, sy * ys if not swap else sy * xs), axis=1)
+                       for swap, sx, sy in reflections], axis=1)
+    keep = np.ones(points.shape[:2], dtype=bool)
+    for i in range(1, len(reflections)):
+        for j in range(i):
+            keep[:, i] &= ~(points[:, i] == points[:, j]).all(axis=1)
+    points = points[keep]
+    return points[:, 0], points[:, 1]
+
+
+_OCTANTS = ((False, 1, 1), (True, 1, 1), (True, -1, 1), (False, -1, 1),
+            (False, -1, -1), (True, -1, -1), (True, 1, -1), (False, 1, -1))
+_QUADRANTS = ((False, 1, 1), (False, -1, 1), (False, 1, -1), (False, -1, -1))
+
+
+def circle_array(radius):
+    """Точки окружности в виде массивов NumPy (xs, ys) - те же, что у circle_offsets."""
+    if radius < 3:
+        return _to_numpy(_mirror(_circle_octant(radius), _octants))
+    return _mirror_array(*_circle_octant_array(radius), _OCTANTS)
+
+
+def ellipse_array(a, b):
+    if a < 1 or b < 1:
+        return _to_numpy(_mirror(_ellipse_quadrant(a, b), _quadrants))
+    return _mirror_array(*_ellipse_quadrant_array(a, b), _QUADRANTS)
+
+
+def hyperbola_array(a, b, x_limit, y_limit):
+    if a < 1 or b < 1:
+        return _to_numpy(_mirror(_hyperbola_quadrant(a, b, x_limit, y_limit), _quadrants))
+    return _mirror_array(*_hyperbola_quadrant_array(a, b, x_limit, y_limit), _QUADRANTS)
+
+
+def parabola_array(p, x_limit, y_limit):
+    sign = -1 if p > 0 else 1
+    return _mirror_array(*_parabola_half_array(abs(p), x_limit, y_limit), ((False, 1, sign), (False, -1, sign)))
+
+
+def _to_numpy(table):
+    return np.asarray(table[0], dtype=np.int64), np.asarray(table[1], dtype=np.int64)
+
+
+def _to_table(points):
+    return array("i", points[0].astype(np.int32).tobytes()), array("i", points[1].astype(np.int32).tobytes())
+
+
+def _vectorize(*sizes):
+    return np is not None and VECTORIZE_FROM <= max(sizes) and max(map(abs, sizes)) <= VECTORIZE_UP_TO
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def circle_offsets(radius):
+    """Смещения (dx, dy) точек окружности в порядке рисования: два массива array('i')."""
+    if _vectorize(radius):
+        return _to_table(circle_array(radius))
+    return _mirror(_circle_octant(radius), _octants)
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def ellipse_offsets(a, b):
+    """Смещения (dx, dy) точек эллипса с полуосями a и b в порядке рисования."""
+    if _vectorize(a, b):
+        return _to_table(ellipse_array(a, b))
+    return _mirror(_ellipse_quadrant(a, b), _quadrants)
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def hyperbola_offsets(a, b, x_limit, y_limit):
+    """Смещения точек гиперболы x²/a² - y²/b² = 1, не дальше x_limit и y_limit от центра."""
+    if _vectorize(a, b, x_limit, y_limit):
+        return _to_table(hyperbola_array(a, b, x_limit, y_limit))
+    return _mirror(_hyperbola_quadrant(a, b, x_limit, y_limit), _quadrants)
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def parabola_offsets(p, x_limit, y_limit):
+    """Смещения точек параболы y = x² / 4p (ось y экрана направлена вниз, поэтому ветви идут вверх при p > 0)."""
+    if _vectorize(p, x_limit, y_limit):
+        return _to_table(parabola_array(p, x_limit, y_limit))
+    sign = -1 if p > 0 else 1
+    return _mirror(_parabola_half(abs(p), x_limit, y_limit), lambda x, y: ((x, sign * y), (-x, sign * y)))
+
+
+def cache_info():
+    return {
+        "circle": circle_offsets.cache_info(),
+        "ellipse": ellipse_offsets.cache_info(),
+        "hyperbola": hyperbola_offsets.cache_info(),
+        "parabola": parabola_offsets.cache_info(),
+    }
@@ -0,0 +1,265 @@
+"""Вычисление параметрических кривых для 3lab.py.
+
+Точка кривой - [t³, t², t, 1] · M · G, где M - базисная матрица типа кривой,
+а G - геометрический вектор из четырех точек. Произведение T · M зависит
+только от типа кривой и числа отсчетов, поэтому таблица весов строится
+один раз и кэшируется; сегмент кривой стоит одного умножения (N×4)·(4×2).
+
+Вместо фиксированного числа отсчетов сегмент можно разбить адаптивно
+(tessellate): кубика переводится в форму Безье и делится пополам по де
+Кастельжо, пока не станет плоской с заданной точностью в пикселях.
+
+CurveDocument хранит много кривых в общих массивах координат и пересчитывает
+измененные сегменты пакетом; при пакетном расчете с NumPy число шагов по t
+для заданной точности оценивается по формуле Вана.
+"""
+from array import array
+from functools import lru_cache
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+from storage import PointTable
+
+SAMPLES = 100  # Число значений t на сегмент
+TOLERANCE = 0.5  # Допустимое отклонение ломаной от кривой при адаптивном разбиении, пикселей
+MAX_DEPTH = 16  # Предел глубины деления (вырожденные сегменты, нулевая точность)
+
+
+def create_matrix(rows, cols, data):
+    """Создает матрицу размером rows x cols, заполняя ее данными из data."""
+    return [data[i * cols:(i + 1) * cols] for i in range(rows)]
+
+
+def matrix_mult(a, b):
+    """Умножение двух матриц."""
+    rows_a, cols_a = len(a), len(a[0])
+    rows_b, cols_b = len(b), len(b[0])
+
+    if cols_a != rows_b:
+        raise ValueError("Матрицы нельзя перемножить")
+
+    result = create_matrix(rows_a, cols_b, [0] * (rows_a * cols_b))
+    for i in range(rows_a):
+        for j in range(cols_b):
+            for k in range(cols_a):
+                result[i][j] += a[i][k] * b[k][j]
+    return result
+
+
+def my_linspace(start, stop, num):
+    """Генерация num равномерно распределенных значений от start до stop."""
+    step = (stop - start) / (num - 1)
+    return [start + i * step for i in range(num)]
+
+
+# Базисные матрицы; порядок точек в геометрическом векторе задает вызывающий код
+BASIS = {
+    "Эрмит": create_matrix(4, 4, [
+        2, -2, 1, 1,
+        -3, 3, -2, -1,
+        0, 0, 1, 0,
+        1, 0, 0, 0
+    ]),
+    "Безье": create_matrix(4, 4, [
+        -1, 3, -3, 1,
+        3, -6, 3, 0,
+        -3, 3, 0, 0,
+        1, 0, 0, 0
+    ]),
+    "B-сплайн": create_matrix(4, 4, [
+        -1 / 6, 3 / 6, -3 / 6, 1 / 6,
+        3 / 6, -6 / 6, 3 / 6, 0,
+        -3 / 6, 0, 3 / 6, 0,
+        1 / 6, 4 / 6, 1 / 6, 0
+    ]),
+}
+
+
+@lru_cache(maxsize=32)
+def weights(curve_type, samples=SAMPLES):
+    """Таблица T · M (samples строк по 4 веса) для типа кривой."""
+    t = my_linspace(0, 1, samples)
+    table = matrix_mult([[val ** 3, val ** 2, val, 1] for val in t], BASIS[curve_type])
+    if np is not None:
+        return np.array(table, dtype=float)
+    return tuple(tuple(row) for row in table)
+
+
+def evaluate(curve_type, geometry, samples=SAMPLES):
+    """Точки сегмента по четырем точкам geometry: плоский список x0, y0, x1, y1, ... (как для canvas)."""
+    table = weights(curve_type, samples)
+    if np is not None:
+        return (table @ np.asarray(geometry, dtype=float)).ravel().tolist()
+    (x0, y0), (x1, y1), (x2, y2), (x3, y3) = geometry
+    coords = []
+    for w0, w1, w2, w3 in table:
+        coords.append(w0 * x0 + w1 * x1 + w2 * x2 + w3 * x3)
+        coords.append(w0 * y0 + w1 * y1 + w2 * y2 + w3 * y3)
+    return coords
+
+
+def bezier_points(curve_type, geometry):
+    # Коэффициенты степенного базиса a·t³ + b·t² + c·t + d (M · G) в контрольные точки Безье того же сегмента
+    basis = BASIS[curve_type]
+    (ax, ay), (bx, by), (cx, cy), (dx, dy) = [
+        [sum(basis[i][k] * geometry[k][axis] for k in range(4)) for axis in (0, 1)] for i in range(4)]
+    return ((dx, dy), (dx + cx / 3, dy + cy / 3), (dx + (2 * cx + bx) / 3, dy + (2 * cy + by) / 3),
+            (ax + bx + cx + dx, ay + by + cy + dy))
+
+
+def tessellate(curve_type, geometry, tolerance=TOLERANCE):
+    """Точки сегмента с адаптивным шагом: плоский список x0, y0, x1, y1, ... не длиннее необходимого."""
+    # Критерий плоскости: max(ux², vx²) + max(uy², vy²) <= 16·tolerance², где u = 3P1 - 2P0 - P3,
+    # v = 3P2 - P0 - 2P3; тогда ломаная P0-P3 отстоит от кривой не больше чем на tolerance
+    limit = 16 * tolerance * tolerance
+    p0, p1, p2, p3 = bezier_points(curve_type, geometry)
+    coords = [p0[0], p0[1]]
+    stack = [(p0, p1, p2, p3, 0)]
+    while stack:
+        p0, p1, p2, p3, depth = stack.pop()
+        ux, uy = 3 * p1[0] - 2 * p0[0] - p3[0], 3 * p1[1] - 2 * p0[1] - p3[1]
+        vx, vy = 3 * p2[0] - p0[0] - 2 * p3[0], 3 * p2[1] - p0[1] - 2 * p3[1]
+        if depth >= MAX_DEPTH or max(ux * ux, vx * vx) + max(uy * uy, vy * vy) <= limit:
+            coords.extend(p3)
+            continue
+        # Деление де Кастельжо при t = 0.5; левая половина кладется последней, чтобы точки шли по порядку
+        p01, p12, p23 = _middle(p0, p1), _middle(p1, p2), _middle(p2, p3)
+        p012, p123 = _middle(p01, p12), _middle(p12, p23)
+        middle = _middle(p012, p123)
+        stack.append((middle, p123, p23, p3, depth + 1))
+        stack.append((p0, p01, p012, middle, depth + 1))
+    return coords
+
+
+def _middle(a, b):
+    return (a[0] + b[0]) / 2, (a[1] + b[1]) / 2
+
+
+def segment_counts(bezier, tolerance):
+    # Число равных шагов по t, при котором ломаная отстоит от кубики не больше tolerance (формула Вана):
+    # n = ceil(sqrt(3 · 2 / 8 · max |P[i+2] - 2P[i+1] + P[i]| / tolerance))
+    second = bezier[:, 2:] - 2 * bezier[:, 1:3] + bezier[:, :2]
+    bound = np.sqrt((second ** 2).sum(axis=2)).max(axis=1)
+    return np.clip(np.ceil(np.sqrt(0.75 * bound / tolerance)), 1, 1 << MAX_DEPTH).astype(np.int64)
+
+
+COLORS = {"Эрмит": "orange", "Безье": "purple", "B-сплайн": "cyan"}
+
+
+class CurveDocument:
+    """Документ из многих независимых кривых разных типов.
+
+    Контрольные точки всех кривых лежат в одной таблице storage.PointTable
+    (непрерывные столбцы x и y), кривая хранит индексы своих точек. Добавление и перемещение точек отмечают
+    затронутые сегменты грязными, evaluate_dirty пересчитывает их одним пакетом:
+    с NumPy - общим умножением на базисную матрицу для всех сегментов типа.
+    """
+
+    def __init__(self):
+        self.points = PointTable()
+        self.owner = array("i")  # Кривая, которой принадлежит точка
+        self.slot = array("i")  # Номер точки внутри своей кривой
+        self.curves = []  # (тип кривой, индексы точек array('i'))
+        self.dirty = set()  # (кривая, сегмент)
+
+    def add_curve(self, curve_type):
+        self.curves.append((curve_type, array("i")))
+        return len(self.curves) - 1
+
+    def is_complete(self, curve):
+        # Эрмит и Безье задаются ровно четырьмя точками; B-сплайн можно продолжать
+        curve_type, indices = self.curves[curve]
+        return curve_type != "B-сплайн" and len(indices) >= 4
+
+    def add_point(self, curve, x, y, radius=5, color="blue"):
+        indices = self.curves[curve][1]
+        index = self.points.append(x, y, radius, color)
+        self.owner.append(curve)
+        self.slot.append(len(indices))
+        indices.append(index)
+        n = len(indices)
+        if self.curves[curve][0] == "B-сплайн":
+            # Новая точка в конце замкнутого сплайна меняет только сегменты, замыкающие кривую, и добавляет один
+            self.dirty.update((curve, segment) for segment in range(max(0, n - 4), n) if n >= 3)
+        elif n == 4:
+            self.dirty.add((curve, 0))
+        return index
+
+    def move_point(self, index, x, y):
+        self.points.move(index, x, y)
+        curve, k = self.owner[index], self.slot[index]
+        n = self.segment_count(curve)
+        if self.curves[curve][0] == "B-сплайн":
+            # Сегмент i зависит от точек i..i+3 по модулю n, поэтому точка k влияет только на сегменты k-3..k
+            self.dirty.update((curve, (k - shift) % n) for shift in range(4) if n)
+        elif n:
+            self.dirty.add((curve, 0))
+
+    def mark_all_dirty(self):
+        for curve in range(len(self.curves)):
+            self.dirty.update((curve, segment) for segment in range(self.segment_count(curve)))
+
+    def segment_count(self, curve):
+        curve_type, indices = self.curves[curve]
+        if curve_type == "B-сплайн":
+            return len(indices) if len(indices) >= 3 else 0
+        return 1 if len(indices) >= 4 else 0
+
+    def segment_points(self, curve, segment):
+        # Индексы точек в порядке геометрического вектора
+        curve_type, indices = self.curves[curve]
+        if curve_type == "B-сплайн":
+            n = len(indices)
+            return [indices[(segment + j) % n] for j in range(4)]
+        if curve_type == "Безье":
+            # Порядок щелчков: начало, конец, затем две промежуточные точки
+            return [indices[0], indices[2], indices[3], indices[1]]
+        return list(indices[:4])
+
+    def evaluate_dirty(self, tolerance=None):
+        """Точки всех грязных сегментов: {(кривая, сегмент): плоский список координат}."""
+        groups = {}
+        for key in self.dirty:
+            groups.setdefault(self.curves[key[0]][0], []).append(key)
+        self.dirty.clear()
+        result = {}
+        for curve_type, keys in groups.items():
+            indices = [self.segment_points(*key) for key in keys]
+            if np is None:
+                for key, points in zip(keys, indices):
+                    geometry = [[self.points.x[i], self.points.y[i]] for i in points]
+                    if curve_type == "Эрмит":
+                        geometry[2] = [geometry[2][0] - geometry[0][0], geometry[2][1] - geometry[0][1]]
+                        geometry[3] = [geometry[3][0] - geometry[1][0], geometry[3][1] - geometry[1][1]]
+                    if tolerance is None:
+                        result[key] = evaluate(curve_type, geometry)
+                    else:
+                        result[key] = tessellate(curve_type, geometry, tolerance)
+                continue
+            result.update(zip(keys, self._evaluate_batch(curve_type, np.array(indices), tolerance)))
+        return result
+
+    def _evaluate_batch(self, curve_type, indices, tolerance):
+        # geometry: (сегменты, 4, 2)
+        geometry = np.stack((np.frombuffer(self.points.x, dtype=float)[indices],
+                             np.frombuffer(self.points.y, dtype=float)[indices]), axis=2)
+        if curve_type == "Эрмит":
+            geometry[:, 2:] -= geometry[:, :2]  # Векторы касательных
+        if tolerance is None:
+            samples = np.einsum("nk,skd->snd", weights(curve_type, SAMPLES), geometry)
+            return [row.ravel().tolist() for row in samples]
+
+        # Коэффициенты a·t³ + b·t² + c·t + d и контрольные точки Безье для оценки числа шагов
+        a, b, c, d = np.moveaxis(np.einsum("ik,skd->sid", np.array(BASIS[curve_type], dtype=float), geometry), 1, 0)
+        bezier = np.stack((d, d + c / 3, d + (2 * c + b) / 3, a + b + c + d), axis=1)
+        counts = segment_counts(bezier, tolerance)
+        # Все вершины всех сегментов одним массивом: сегмент s дает counts[s] + 1 точку при t = i / counts[s]
+        sizes = counts + 1
+        owners = np.repeat(np.arange(len(counts)), sizes)
+        steps = np.arange(sizes.sum()) - np.repeat(np.cumsum(sizes) - sizes, sizes)
+        t = (steps / counts[owners])[:, None]
+        points = ((a[owners] * t + b[owners]) * t + c[owners]) * t + d[owners]
+        return [chunk.ravel().tolist() for chunk in np.split(points, np.cumsum(sizes)[:-1])]
@@ -1,13 +1,39 @@
+import math
 import tkinter as tk
-from tkinter import messagebox
+from tkinter import filedialog, messagebox
+try:
+    import numpy as np
+except ImportError:
+    np = None
 import algoritm1.dda as dda
 import algoritm1.bresenham as bresenham
 import algoritm1.wu as wu
+from algoritm1.batch import clip_parameters
+from algoritm1.clipping import liang_barsky
+from algoritm1.framebuffer import FrameBuffer
+import scene_file
+from raster_worker import RasterWorker
+from stepper import Stepper
+from storage import ALGORITHMS, SegmentTable
 
 selected_algorithm = None
 debug_mode = False
 start_point = None
 scale_factor = 4.0
+origin_x, origin_y = 0.0, 0.0
+pan_anchor = None
+pan_job = None  # Отложенная перерисовка после сдвига вида
+scene = SegmentTable()  # Отрезки в логических координатах, по столбцам
+ALGORITHM_MODULES = {"dda": dda, "bresenham": bresenham, "wu": wu}
+
+BACKGROUND = "#f8f8f2"
+# Пределы масштаба: буфер кадра занимает (размер холста / масштаб) логических пикселей,
+# поэтому при сильном уменьшении он рос бы без ограничений
+MIN_SCALE = 0.5
+MAX_SCALE = 64.0
+REDRAW_CHUNK = 2000  # Отрезков на один пакет draw_lines при перерисовке сцены
+PAN_FRAME_MS = 16  # Не чаще одной перерисовки сцены за кадр при перетаскивании вида
+DEBUG_DELAYS = (500, 200, 100, 50, 20, 5, 1, 0)  # Задержки между пикселями в отладке, мс
 
 def set_algorithm(algorithm_module):
     global selected_algorithm, start_point
@@ -21,14 +47,87 @@ def toggle_debug():
     status = "ON" if debug_mode else "OFF"
     status_var.set(f"Отладочный режим: {status}")
 
+def change_speed(direction):
+    # direction > 0 - быстрее (меньше задержка), < 0 - медленнее
+    index = DEBUG_DELAYS.index(stepper.delay) if stepper.delay in DEBUG_DELAYS else 3
+    index = min(max(index + direction, 0), len(DEBUG_DELAYS) - 1)
+    stepper.set_delay(DEBUG_DELAYS[index])
+    show_stepper_state(stepper)
+
+def show_stepper_state(state):
+    if state.running or state.paused:
+        mode = "пауза" if state.paused else "воспроизведение"
+        status_var.set(f"Отладка: {mode}, задержка {state.delay} мс "
+                       "(Пробел - пауза, → - шаг, Esc - без анимации, +/- - скорость)")
+
+def plot_debug_pixel(algorithm_module, pixel):
+    if algorithm_module is wu:
+        framebuffer.draw_intensities((pixel,))
+    else:
+        framebuffer.put_pixel(pixel[0], pixel[1], (0, 0, 0))
+
+def finish_debug_segment(algorithm_module, pixels):
+    # Остаток прерванной анимации рисуется сразу; уже выведенные пиксели не повторяются,
+    # поэтому у Ву смешивание не удваивается
+    for pixel in pixels:
+        plot_debug_pixel(algorithm_module, pixel)
+
+def visible_segments(clip):
+    # Отрезки сцены, задевающие clip (с запасом в два пикселя на соседнюю строку Ву), по алгоритмам.
+    # Отбор - по столбцам таблицы; результат - копия, таблица после этого может расти
+    if np is not None and len(scene):
+        columns = [np.frombuffer(getattr(scene, name), dtype=np.float64) for name in ("x0", "y0", "x1", "y1")]
+        t0, t1 = clip_parameters(*columns, clip, margin=2)
+        visible = t0 <= t1
+        segments = np.stack(columns, axis=1)[visible]
+        codes = np.frombuffer(scene.algorithm, dtype=np.uint8)[visible]
+        del columns  # Отпустить буферы столбцов, иначе array не сможет расширяться
+        return {name: segments[codes == code] for code, name in enumerate(ALGORITHMS)}
+    groups = {name: [] for name in ALGORITHMS}
+    for x0, y0, x1, y1, algorithm in scene.segments():
+        if liang_barsky(x0, y0, x1, y1, clip, margin=2) is not None:
+            groups[algorithm].append((x0, y0, x1, y1))
+    return groups
+
+def raster_chunks(algorithm_module, segments, clip):
+    # Выполняется в рабочем потоке: пиксели пакетами по REDRAW_CHUNK отрезков
+    if algorithm_module is bresenham:
+        # Концы в редакторе - целые логические пиксели, в таблице они хранятся как double
+        segments = np.rint(segments) if np is not None else [[round(v) for v in s] for s in segments]
+    for start in range(0, len(segments), REDRAW_CHUNK):
+        yield algorithm_module.draw_lines(segments[start:start + REDRAW_CHUNK], clip)
+
+def draw_chunks(target, algorithm_module, chunks):
+    for pixels in chunks:
+        if algorithm_module is wu:
+            target.put_intensities(*pixels)
+        else:
+            target.put_pixels(*pixels)
+
+def segment_chunks(algorithm_module, x0, y0, x1, y1, clip):
+    # Выполняется в рабочем потоке. Повторяющаяся форма отрезка берется из кэша узоров и переносится
+    # на место целиком (невидимые пиксели отбрасывает put_pixels); остальные отрезки считаются
+    # draw_lines с отсечением по буферу
+    columns = algorithm_module.cached_columns(x0, y0, x1, y1)
+    if columns is not None:
+        yield columns
+    else:
+        yield from raster_chunks(algorithm_module, [(x0, y0, x1, y1)], clip)
+
+def rasterize(algorithm_module, x0, y0, x1, y1):
+    # Пиксели считаются в рабочем потоке, в буфер их переносит главный поток при опросе очереди
+    target = framebuffer
+    raster_worker.submit(segment_chunks(algorithm_module, x0, y0, x1, y1, target.bounds()),
+                         lambda chunks: draw_chunks(target, algorithm_module, chunks), batch_size=1)
+
 def on_canvas_click(event):
     global start_point
     if selected_algorithm is None:
         messagebox.showwarning("Не выбран алгоритм", "Сначала выберите алгоритм построения отрезка из меню!")
         return
 
-    x = int(round(event.x / scale_factor))
-    y = int(round(event.y / scale_factor))
+    x = int(round((event.x - origin_x) / scale_factor))
+    y = int(round((event.y - origin_y) / scale_factor))
 
     if start_point is None:
         start_point = (x, y)
@@ -36,25 +135,121 @@ def on_canvas_click(event):
     else:
         end_point = (x, y)
         status_var.set(f"Отрезок: {start_point} -> {end_point}")
-        selected_algorithm.draw_line(canvas, start_point[0], start_point[1],
-                                     end_point[0], end_point[1], debug_mode)
+        segment = (start_point[0], start_point[1], end_point[0], end_point[1], selected_algorithm)
+        # Отрезок попадает в сцену сразу: перерисовка во время анимации (масштаб, сдвиг, размер окна)
+        # сбрасывает анимацию и рисует его целиком вместе со сценой
+        add_to_scene(segment)
+        if debug_mode:
+            # Пиксели выводятся по таймеру; Esc прерывает анимацию и дорисовывает отрезок сразу
+            algorithm_module = selected_algorithm
+            stepper.start(algorithm_module.pixels(*segment[:4], framebuffer.bounds()),
+                          lambda pixel: plot_debug_pixel(algorithm_module, pixel),
+                          on_frame=refresh_view, on_cancel=lambda rest: finish_debug_segment(algorithm_module, rest))
+        else:
+            rasterize(selected_algorithm, *segment[:4])
         start_point = None
 
+def add_to_scene(segment):
+    x0, y0, x1, y1, algorithm_module = segment
+    scene.append(x0, y0, x1, y1, algorithm_module.__name__.rsplit(".", 1)[-1])
+
+def redraw_scene(event=None):
+    # Буфер кадра покрывает только видимую область в логических пикселях; сцена растеризуется в него заново
+    global framebuffer, pan_job
+    if pan_job is not None:
+        root.after_cancel(pan_job)
+        pan_job = None
+    stepper.cancel_all()  # Анимации привязаны к старому буферу; их отрезки уже в сцене и рисуются ниже целиком
+    raster_worker.cancel_all()  # Результаты для старого буфера больше не нужны, сцена растеризуется заново
+    left = math.floor(-origin_x / scale_factor)
+    top = math.floor(-origin_y / scale_factor)
+    width = math.ceil(canvas.winfo_width() / scale_factor) + 1
+    height = math.ceil(canvas.winfo_height() / scale_factor) + 1
+    framebuffer = FrameBuffer(width, height, background=BACKGROUND, left=left, top=top)
+    # Невидимые отрезки отбрасываются сразу; видимые считаются одной задачей на алгоритм,
+    # пакетами draw_lines с отсечением по буферу
+    clip = framebuffer.bounds()
+    for algorithm, segments in visible_segments(clip).items():
+        if len(segments):
+            algorithm_module = ALGORITHM_MODULES[algorithm]
+            raster_worker.submit(raster_chunks(algorithm_module, segments, clip),
+                                 lambda chunks, target=framebuffer, module=algorithm_module:
+                                 draw_chunks(target, module, chunks), batch_size=1)
+    refresh_view()
+
+def save_scene():
+    path = filedialog.asksaveasfilename(defaultextension=".scene", filetypes=[("Сцена", "*.scene")])
+    if path:
+        scene_file.save(path, segments=scene)
+        status_var.set(f"Сохранено отрезков: {len(scene)}")
+
+def open_scene():
+    global scene
+    path = filedialog.askopenfilename(filetypes=[("Сцена", "*.scene")])
+    if not path:
+        return
+    try:
+        with scene_file.SceneFile(path) as f:
+            # Столбцы копируются из отображения файла целиком, без разбора по отрезкам
+            scene = f.load_table(type(scene), "segments")
+    except (OSError, ValueError) as error:
+        messagebox.showerror("Ошибка", str(error))
+        return
+    redraw_scene()
+    status_var.set(f"Загружено отрезков: {len(scene)}")
+
+def refresh_view():
+    # Один перенос буфера в PhotoImage и масштабирование копированием средствами Tk
+    framebuffer.blit(frame_photo)
+    view_photo.blank()
+    if scale_factor >= 1:
+        zoom_args = ("-zoom", int(scale_factor), int(scale_factor))
+    else:
+        zoom_args = ("-subsample", int(round(1 / scale_factor)), int(round(1 / scale_factor)))
+    view_photo.tk.call(view_photo, "copy", frame_photo, *zoom_args)
+    canvas.coords(view_item, origin_x + framebuffer.left * scale_factor, origin_y + framebuffer.top * scale_factor)
+
 def zoom(factor, select_x=0, select_y=0):
-    global scale_factor
-    new_scale = scale_factor * factor
-    canvas.scale("all", select_x, select_y, factor, factor)
+    global scale_factor, origin_x, origin_y
+    new_scale = min(max(scale_factor * factor, MIN_SCALE), MAX_SCALE)
+    if new_scale == scale_factor:
+        return
+    factor = new_scale / scale_factor
+    origin_x = select_x + (origin_x - select_x) * factor
+    origin_y = select_y + (origin_y - select_y) * factor
     scale_factor = new_scale
+    redraw_scene()
     status_var.set(f"Масштаб: {scale_factor:.2f}")
 
 def zoom_in():
     zoom(2.0, 0, 0)
 
 def zoom_out():
-    if scale_factor <= 1.0:
-        return
     zoom(0.5, 0, 0)
 
+def start_pan(event):
+    global pan_anchor
+    pan_anchor = (event.x, event.y)
+
+def pan(event):
+    # Событие только сдвигает готовое изображение; сцена перерисовывается один раз за кадр по таймеру
+    global pan_anchor, origin_x, origin_y, pan_job
+    if pan_anchor is None:
+        return
+    origin_x += event.x - pan_anchor[0]
+    origin_y += event.y - pan_anchor[1]
+    pan_anchor = (event.x, event.y)
+    canvas.coords(view_item, origin_x + framebuffer.left * scale_factor, origin_y + framebuffer.top * scale_factor)
+    if pan_job is None:
+        pan_job = root.after(PAN_FRAME_MS, redraw_scene)
+
+def end_pan(event):
+    # Последнее смещение дорисовывается сразу, не дожидаясь таймера
+    global pan_anchor
+    pan_anchor = None
+    if pan_job is not None:
+        redraw_scene()
+
 def on_right_click(event):
     context_menu = tk.Menu(root, tearoff=0, bg="#44475a", fg="white", relief="raised")
     context_menu.add_command(label="🔍 Увеличить", command=lambda: zoom(2.0, event.x, event.y))
@@ -70,6 +265,11 @@ root.configure(bg="#282a36")  # Темный фон
 menu_bar = tk.Menu(root, bg="#44475a", fg="white", relief="flat")
 root.config(menu=menu_bar)
 
+file_menu = tk.Menu(menu_bar, tearoff=0, bg="#6272a4", fg="white", relief="ridge")
+menu_bar.add_cascade(label="📁 Файл", menu=file_menu)
+file_menu.add_command(label="Открыть сцену...", command=open_scene)
+file_menu.add_command(label="Сохранить сцену...", command=save_scene)
+
 line_menu = tk.Menu(menu_bar, tearoff=0, bg="#6272a4", fg="white", relief="ridge")
 menu_bar.add_cascade(label="🖊️ Отрезки", menu=line_menu)
 line_menu.add_command(label="Алгоритм ЦДА", command=lambda: set_algorithm(dda))
@@ -79,6 +279,12 @@ line_menu.add_command(label="Алгоритм Ву", command=lambda: set_algorit
 debug_menu = tk.Menu(menu_bar, tearoff=0, bg="#6272a4", fg="white", relief="ridge")
 menu_bar.add_cascade(label="⚙️ Отладка", menu=debug_menu)
 debug_menu.add_command(label="Переключить отладочный режим", command=toggle_debug)
+debug_menu.add_separator()
+debug_menu.add_command(label="Пауза / продолжить", accelerator="Пробел", command=lambda: stepper.toggle())
+debug_menu.add_command(label="Шаг", accelerator="→", command=lambda: stepper.step())
+debug_menu.add_command(label="Быстрее", accelerator="+", command=lambda: change_speed(1))
+debug_menu.add_command(label="Медленнее", accelerator="-", command=lambda: change_speed(-1))
+debug_menu.add_command(label="Дорисовать отрезок без анимации", accelerator="Esc", command=lambda: stepper.cancel())
 
 zoom_menu = tk.Menu(menu_bar, tearoff=0, bg="#6272a4", fg="white", relief="ridge")
 menu_bar.add_cascade(label="🔎 Масштаб", menu=zoom_menu)
@@ -90,6 +296,24 @@ canvas = tk.Canvas(root, bg="#f8f8f2", relief="ridge", bd=5)
 canvas.pack(fill=tk.BOTH, expand=True)
 canvas.bind("<Button-1>", on_canvas_click)
 canvas.bind("<Button-3>", on_right_click)
+canvas.bind("<ButtonPress-2>", start_pan)
+canvas.bind("<B2-Motion>", pan)
+canvas.bind("<ButtonRelease-2>", end_pan)
+canvas.bind("<Configure>", redraw_scene)
+root.bind("<space>", lambda event: stepper.toggle())
+root.bind("<Right>", lambda event: stepper.step())
+root.bind("<plus>", lambda event: change_speed(1))
+root.bind("<equal>", lambda event: change_speed(1))
+root.bind("<minus>", lambda event: change_speed(-1))
+root.bind("<Escape>", lambda event: stepper.cancel())
+
+# Отрезки растеризуются в буфер кадра, который выводится на холст одним изображением
+framebuffer = FrameBuffer(1, 1, background=BACKGROUND)
+frame_photo = tk.PhotoImage()
+view_photo = tk.PhotoImage()
+view_item = canvas.create_image(0, 0, image=view_photo, anchor=tk.NW)
+stepper = Stepper(root, delay=50, on_state=show_stepper_state)
+raster_worker = RasterWorker(root, on_frame=refresh_view)
 
 # 3D кнопки
 button_frame = tk.Frame(root, bg="#282a36")
@@ -110,21 +334,6 @@ btn_toggle_debug = tk.Button(button_frame, text="⚙️ Отладка", command
                              relief="raised", bd=4, padx=10, pady=5)
 btn_toggle_debug.pack(side=tk.RIGHT, padx=5)
 
-# Переопределение методов рисования с учетом масштаба
-orig_create_rectangle = canvas.create_rectangle
-orig_create_line = canvas.create_line
-
-def create_rectangle_zoomed(x1, y1, x2, y2, *args, **kwargs):
-    return orig_create_rectangle(x1 * scale_factor, y1 * scale_factor,
-                                 x2 * scale_factor, y2 * scale_factor, *args, **kwargs)
-
-def create_line_zoomed(*args, **kwargs):
-    new_args = [coord * scale_factor for coord in args]
-    return orig_create_line(*new_args, **kwargs)
-
-canvas.create_rectangle = create_rectangle_zoomed
-canvas.create_line = create_line_zoomed
-
 # Статусная строка
 status_var = tk.StringVar()
 status_var.set("Выберите алгоритм построения отрезка")
@@ -134,3 +343,4 @@ status_bar = tk.Label(root, textvariable=status_var, bd=2, relief=tk.SUNKEN,
 status_bar.pack(side=tk.BOTTOM, fill=tk.X)
 
 root.mainloop()
+raster_worker.shutdown()
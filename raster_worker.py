@@ -0,0 +1,100 @@
+"""Растеризация в фоновых потоках.
+
+Поток точек примитива вычисляется в пуле потоков и передается пакетами
+через очередь. Главный поток Tk забирает пакеты по таймеру after() в
+пределах бюджета кадра и только рисует их, поэтому большие примитивы не
+задерживают обработку ввода, а несколько примитивов считаются одновременно.
+Tk вызывается только из главного потока.
+"""
+import queue
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+POLL_MS = 15 # Период опроса очереди, мс
+POLL_BUDGET = 0.010 # Сколько времени главного потока можно тратить на рисование пакетов за опрос, с
+
+
+class RasterWorker:
+
+    def __init__(self, widget, workers=2, batch_size=1024, on_frame=None):
+        self.widget = widget
+        self.batch_size = batch_size
+        self.on_frame = on_frame # Вызывается после опроса, в котором был нарисован хотя бы один пакет
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="raster")
+        self._results = queue.Queue()
+        self._handlers = {} # номер задачи -> (рисование пакета, по завершении)
+        self._next_task = 0
+        self._timer = None
+
+    @property
+    def busy(self):
+        return bool(self._handlers)
+
+    def submit(self, points, on_batch, on_done=None, batch_size=None):
+        # points - ленивый итерируемый объект (например, генератор): он выполняется уже в рабочем потоке.
+        # batch_size=1, если элементы сами уже пакеты (например, массивы пикселей draw_lines)
+        self._next_task += 1
+        task = self._next_task
+        self._handlers[task] = (on_batch, on_done)
+        self._executor.submit(self._produce, task, points, batch_size or self.batch_size)
+        self._schedule()
+        return task
+
+    def cancel(self, task):
+        # Рабочий поток прекращает вычисление, уже готовые пакеты задачи отбрасываются
+        self._handlers.pop(task, None)
+
+    def cancel_all(self):
+        self._handlers.clear()
+
+    def shutdown(self):
+        self.cancel_all()
+        self._executor.shutdown(wait=False)
+
+    def _produce(self, task, points, batch_size):
+        batch = []
+        try:
+            for point in points:
+                if task not in self._handlers:
+                    return
+                batch.append(point)
+                if len(batch) >= batch_size:
+                    self._results.put((task, batch))
+                    batch = []
+            if batch:
+                self._results.put((task, batch))
+            self._results.put((task, None))
+        except Exception as error:
+            self._results.put((task, error))
+
+    def _schedule(self):
+        if self._timer is None and self._handlers:
+            self._timer = self.widget.after(POLL_MS, self._poll)
+
+    def _poll(self):
+        self._timer = None
+        deadline = time.perf_counter() + POLL_BUDGET
+        drawn = False
+        try:
+            while time.perf_counter() < deadline:
+                try:
+                    task, batch = self._results.get_nowait()
+                except queue.Empty:
+                    break
+                handler = self._handlers.get(task)
+                if handler is None:
+                    continue
+                on_batch, on_done = handler
+                if batch is None or isinstance(batch, Exception):
+                    del self._handlers[task]
+                    if isinstance(batch, Exception):
+                        raise batch # Ошибку рабочего потока показывает обработчик исключений Tk
+                    if on_done is not None:
+                        on_done()
+                else:
+                    on_batch(batch)
+                    drawn = True
+        finally:
+            if drawn and self.on_frame is not None:
+                self.on_frame()
+            self._schedule()
@@ -0,0 +1,175 @@
+"""Пакетная отрисовка отрезков в файл без графического интерфейса.
+
+Формат входного файла: по одному примитиву в строке, строки с # пропускаются.
+
+    line x0 y0 x1 y1
+    x0 y0 x1 y1
+
+Двоичный файл сцены (scene_file, *.scene) читается через отображение в память
+порциями; каждый отрезок рисуется алгоритмом, сохраненным для него в сцене,
+если алгоритм не задан явно ключом -a. Для текстового файла по умолчанию
+используется алгоритм Брезенхема.
+
+Изображение делится на тайлы, которые рисуются параллельно в пуле процессов;
+каждый процесс растеризует только отрезки, пересекающие его тайл, и только
+ту их часть, что лежит в тайле.
+
+    python render.py scene.txt -o scene.png -a wu --width 1920 --height 1080
+"""
+import argparse
+import os
+import sys
+from multiprocessing import Pool
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+import algoritm1.bresenham as bresenham
+import algoritm1.dda as dda
+import algoritm1.wu as wu
+from algoritm1.batch import clip_parameters
+from algoritm1.clipping import liang_barsky
+from algoritm1.framebuffer import FrameBuffer
+from scene_file import SceneFile, is_scene_file
+from storage import ALGORITHMS as SCENE_ALGORITHMS
+
+ALGORITHMS = {"dda": dda, "bresenham": bresenham, "wu": wu}
+CHUNK_SIZE = 50000
+
+
+def read_segments(path):
+    segments = []
+    with open(path, encoding="utf-8") as f:
+        for number, line in enumerate(f, 1):
+            fields = line.split("#", 1)[0].split()
+            if not fields:
+                continue
+            if fields[0] == "line":
+                fields = fields[1:]
+            if len(fields) != 4:
+                raise ValueError(f"{path}:{number}: ожидается 'line x0 y0 x1 y1', получено: {line.strip()}")
+            segments.append([float(value) for value in fields])
+    return segments
+
+
+def read_scene(scene, algorithm=None):
+    # Порции отрезков открытой сцены по алгоритмам: (алгоритм, отрезки). Столбцы берутся из отображения
+    # файла по CHUNK_SIZE отрезков, вся сцена в память не собирается. Заданный algorithm заменяет
+    # алгоритмы, сохраненные для отрезков
+    if np is None:
+        groups = {}
+        for x0, y0, x1, y1, name in scene.segments():
+            groups.setdefault(algorithm or name, []).append([x0, y0, x1, y1])
+        yield from groups.items()
+        return
+    for chunk, codes in scene.segment_chunks(CHUNK_SIZE):
+        if algorithm is not None:
+            yield algorithm, chunk
+            continue
+        codes = np.array(codes)  # Копия: представление над отображением не должно пережить файл
+        for code in np.unique(codes):
+            if code >= len(SCENE_ALGORITHMS):
+                raise ValueError(f"{scene.path}: неизвестный код алгоритма {code}")
+            yield SCENE_ALGORITHMS[code], chunk[codes == code]
+
+
+def split_tiles(width, height, tile_size):
+    return [(x, y, min(tile_size, width - x), min(tile_size, height - y))
+            for y in range(0, height, tile_size) for x in range(0, width, tile_size)]
+
+
+def segments_in_tile(segments, tile):
+    # Отрезки, проходящие через тайл с запасом в два пикселя (Ву рисует соседнюю строку), - пересечение
+    # отрезка с прямоугольником, а не ограничивающих прямоугольников: диагональ не попадает во все тайлы
+    x, y, w, h = tile
+    clip = (x, y, x + w - 1, y + h - 1)
+    if np is not None:
+        t0, t1 = clip_parameters(*segments.T, clip, margin=2)
+        return segments[t0 <= t1]
+    return [s for s in segments if liang_barsky(*s, clip, margin=2) is not None]
+
+
+def render_tile(job):
+    tile, parts, background, color = job
+    x, y, w, h = tile
+    clip = (x, y, x + w - 1, y + h - 1)
+    framebuffer = FrameBuffer(w, h, background, left=x, top=y)
+    for algorithm, segments in parts:
+        module = ALGORITHMS[algorithm]
+        if algorithm == "bresenham":
+            segments = np.rint(segments) if np is not None else [[round(v) for v in s] for s in segments]
+        for start in range(0, len(segments), CHUNK_SIZE):
+            # Пиксели считаются в координатах всего изображения, чтобы тайлы стыковались без швов;
+            # шаги вне тайла отбрасываются до растеризации, а не после
+            pixels = module.draw_lines(segments[start:start + CHUNK_SIZE], clip)
+            if module is wu:
+                framebuffer.put_intensities(*pixels, color)
+            else:
+                framebuffer.put_pixels(*pixels, color)
+    return framebuffer
+
+
+def render(groups, width, height, tile_size=256, workers=None, background="white", color="black"):
+    # groups - порции отрезков (алгоритм, отрезки); каждая сразу раскладывается по тайлам,
+    # так что целиком хранятся только выбранные для тайлов отрезки
+    tiles = split_tiles(width, height, tile_size)
+    parts = {tile: [] for tile in tiles}
+    for algorithm, segments in groups:
+        if np is not None:
+            segments = np.asarray(segments, dtype=float).reshape(-1, 4)
+        for tile in tiles:
+            tile_segments = segments_in_tile(segments, tile)
+            if len(tile_segments):
+                parts[tile].append((algorithm, tile_segments))
+    jobs = [(tile, parts[tile], background, color) for tile in tiles if parts[tile]]
+
+    image = FrameBuffer(width, height, background)
+    if workers == 1 or len(jobs) <= 1:
+        for framebuffer in map(render_tile, jobs):
+            image.paste(framebuffer)
+    else:
+        with Pool(workers) as pool:
+            for framebuffer in pool.imap_unordered(render_tile, jobs):
+                image.paste(framebuffer)
+    return image
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Пакетная отрисовка отрезков в изображение PPM/PNG")
+    parser.add_argument("input", help="файл с отрезками")
+    parser.add_argument("-o", "--output", default="output.png", help="файл изображения (.ppm или .png)")
+    parser.add_argument("-a", "--algorithm", choices=sorted(ALGORITHMS),
+                        help="алгоритм для всех отрезков (по умолчанию: из сцены, для текста - bresenham)")
+    parser.add_argument("--width", type=int, default=800)
+    parser.add_argument("--height", type=int, default=600)
+    parser.add_argument("--tile", type=int, default=256, help="размер стороны тайла в пикселях")
+    parser.add_argument("-j", "--workers", type=int, default=os.cpu_count(), help="число процессов")
+    parser.add_argument("--background", default="white")
+    parser.add_argument("--color", default="black")
+    args = parser.parse_args(argv)
+
+    options = (args.width, args.height, args.tile, args.workers, args.background, args.color)
+    try:
+        if is_scene_file(args.input):
+            with SceneFile(args.input) as scene:
+                count = len(scene)
+                image = render(read_scene(scene, args.algorithm), *options)
+        else:
+            segments = read_segments(args.input)
+            count = len(segments)
+            image = render([(args.algorithm or "bresenham", segments)], *options)
+    except (OSError, ValueError) as error:
+        print(error, file=sys.stderr)
+        return 1
+
+    data = image.to_ppm() if args.output.lower().endswith(".ppm") else image.to_png()
+    with open(args.output, "wb") as f:
+        f.write(data)
+    print(f"{count} отрезков -> {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,226 @@
+"""Двоичный формат сцены (*.scene) для main.py, 2lab.py, 3lab.py и render.py.
+
+Файл - заголовок, таблица столбцов и сами столбцы. Каждый столбец - массив
+одного типа (как в storage.py), выровненный на 8 байт, числа в порядке
+little-endian:
+
+    заголовок       "<8sHHI": сигнатура, версия, резерв, число столбцов
+    таблица         "<32scxxxxxxxQQ" на столбец: имя, код типа array, смещение, длина
+    столбцы         segments.x0 ... segments.algorithm, figures.*, points.*, curves.*
+    палитры         <таблица>.palette - имена цветов через \\0 (байты)
+
+При чтении файл отображается в память (mmap), столбцы отдаются как
+memoryview или массивы NumPy без копирования, поэтому даже файл на
+миллион отрезков открывается сразу, а отрезки читаются порциями.
+"""
+import mmap
+import os
+import struct
+import sys
+from array import array
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+from storage import ALGORITHMS, CURVES, FIGURES, FigureTable
+
+MAGIC = b"GIISSCN\x00"
+VERSION = 1
+HEADER = struct.Struct("<8sHHI")
+ENTRY = struct.Struct("<32scxxxxxxxQQ")
+ALIGN = 8
+
+
+def _palette_bytes(palette):
+    return array("B", "\0".join(palette.colors).encode("utf-8"))
+
+
+def _columns(segments, figures, points, curves):
+    # (имя, массив) всех сохраняемых столбцов
+    for prefix, table in (("segments", segments), ("figures", figures), ("points", points)):
+        if table is None:
+            continue
+        for name, _ in table.columns:
+            if name != "item":  # Элементы холста при загрузке создаются заново
+                yield f"{prefix}.{name}", getattr(table, name)
+        yield f"{prefix}.palette", _palette_bytes(table.palette)
+    if curves:
+        kinds, firsts, counts, indices = array("B"), array("I"), array("I"), array("i")
+        for curve_type, curve_indices in curves:
+            kinds.append(CURVES.index(curve_type))
+            firsts.append(len(indices))
+            counts.append(len(curve_indices))
+            indices.extend(curve_indices)
+        yield from (("curves.type", kinds), ("curves.first", firsts), ("curves.count", counts),
+                    ("curves.indices", indices))
+
+
+def save(path, segments=None, figures=None, points=None, curves=()):
+    """Записывает таблицы storage и кривые [(тип, индексы точек в points)] в файл сцены."""
+    columns = list(_columns(segments, figures, points, curves))
+    offset = HEADER.size + ENTRY.size * len(columns)
+    entries = []
+    for name, column in columns:
+        offset += -offset % ALIGN
+        entries.append(ENTRY.pack(name.encode("utf-8"), column.typecode.encode("ascii"), offset, len(column)))
+        offset += column.itemsize * len(column)
+
+    with open(path, "wb") as f:
+        f.write(HEADER.pack(MAGIC, VERSION, 0, len(columns)))
+        f.write(b"".join(entries))
+        for name, column in columns:
+            f.write(b"\0" * (-f.tell() % ALIGN))
+            if sys.byteorder == "big":
+                column = array(column.typecode, column)
+                column.byteswap()
+            column.tofile(f)
+
+
+def is_scene_file(path):
+    with open(path, "rb") as f:
+        return f.read(len(MAGIC)) == MAGIC
+
+
+class SceneFile:
+    """Файл сцены, отображенный в память; столбцы читаются без копирования."""
+
+    def __init__(self, path):
+        self.path = path
+        self._file = open(path, "rb")
+        self._map = None
+        self._views = []
+        try:
+            if os.fstat(self._file.fileno()).st_size < HEADER.size:
+                raise ValueError(f"{path}: не файл сцены")
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+            self._entries = self._read_entries(path)
+        except BaseException:
+            self.close()
+            raise
+
+    def _read_entries(self, path):
+        # Таблица столбцов; каждый столбец должен целиком лежать в файле, иначе файл обрезан или испорчен
+        size = len(self._map)
+        magic, version, _, count = HEADER.unpack_from(self._map, 0)
+        if magic != MAGIC:
+            raise ValueError(f"{path}: не файл сцены")
+        if version > VERSION:
+            raise ValueError(f"{path}: неподдерживаемая версия формата {version}")
+        if HEADER.size + count * ENTRY.size > size:
+            raise ValueError(f"{path}: файл сцены обрезан (таблица столбцов)")
+        entries = {}
+        for i in range(count):
+            name, typecode, offset, length = ENTRY.unpack_from(self._map, HEADER.size + i * ENTRY.size)
+            try:
+                name, typecode = name.rstrip(b"\0").decode("utf-8"), typecode.decode("ascii")
+                itemsize = array(typecode).itemsize
+            except (UnicodeDecodeError, ValueError):
+                raise ValueError(f"{path}: файл сцены поврежден (столбец {i})") from None
+            if offset + itemsize * length > size:
+                raise ValueError(f"{path}: файл сцены обрезан (столбец {name})")
+            entries[name] = (typecode, offset, length)
+        return entries
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        for view in self._views:
+            view.release()
+        self._views = []
+        if self._map is not None:
+            try:
+                self._map.close()
+            except BufferError:
+                pass  # Остались массивы NumPy над отображением: память освободится вместе с ними
+        self._file.close()
+
+    def __contains__(self, name):
+        return name in self._entries
+
+    def column(self, name):
+        """Столбец как memoryview нужного типа без копирования (пустой, если столбца нет)."""
+        if name not in self._entries:
+            return memoryview(b"")
+        typecode, offset, length = self._entries[name]
+        size = struct.calcsize(typecode)
+        view = memoryview(self._map)[offset:offset + size * length].cast(typecode)
+        self._views.append(view)
+        return view
+
+    def numpy(self, name):
+        """Столбец как массив NumPy над отображением файла, без копирования."""
+        typecode, offset, length = self._entries[name]
+        return np.frombuffer(self._map, dtype=np.dtype(typecode).newbyteorder("<"), count=length, offset=offset)
+
+    def palette(self, prefix):
+        data = bytes(self.column(f"{prefix}.palette"))
+        return data.decode("utf-8").split("\0") if data else []
+
+    def __len__(self):
+        return self._entries.get("segments.x0", ("d", 0, 0))[2]
+
+    def _checked(self, rows):
+        # Номер алгоритма, цвета или точки вне своей таблицы - признак испорченного файла
+        try:
+            yield from rows
+        except IndexError:
+            raise ValueError(f"{self.path}: файл сцены поврежден (номер вне таблицы)") from None
+
+    def segments(self):
+        """Поток отрезков (x0, y0, x1, y1, имя алгоритма) прямо из отображения файла."""
+        columns = [self.column(f"segments.{name}") for name in ("x0", "y0", "x1", "y1", "algorithm")]
+        return self._checked((x0, y0, x1, y1, ALGORITHMS[code]) for x0, y0, x1, y1, code in zip(*columns))
+
+    def segment_chunks(self, size=65536):
+        """Порции отрезков для algoritm1.*.draw_lines: (массив (n, 4), коды алгоритмов)."""
+        if "segments.x0" not in self:
+            return
+        columns = [self.numpy(f"segments.{name}") for name in ("x0", "y0", "x1", "y1")]
+        algorithms = self.numpy("segments.algorithm")
+        for start in range(0, len(self), size):
+            yield (np.stack([column[start:start + size] for column in columns], axis=1),
+                   algorithms[start:start + size])
+
+    def figures(self):
+        palette = self.palette("figures")
+        columns = [self.column(f"figures.{name}") for name, _ in FigureTable.columns if name != "item"]
+        return self._checked((FIGURES[kind], x, y, size1, size2, palette[color])
+                             for kind, x, y, size1, size2, color in zip(*columns))
+
+    def curves(self):
+        """Кривые: (тип, [(x, y, радиус, цвет), ...])."""
+        palette = self.palette("points")
+        x, y = self.column("points.x"), self.column("points.y")
+        radius, color = self.column("points.radius"), self.column("points.color")
+        indices = self.column("curves.indices")
+        return self._checked((CURVES[kind], [(x[i], y[i], radius[i], palette[color[i]])
+                                             for i in indices[first:first + count]])
+                             for kind, first, count in zip(self.column("curves.type"), self.column("curves.first"),
+                                                           self.column("curves.count")))
+
+    def load_table(self, table_class, prefix):
+        """Копия таблицы для редактирования: столбцы заполняются целиком из отображения."""
+        table = table_class()
+        for name, typecode in table_class.columns:
+            if f"{prefix}.{name}" in self:
+                getattr(table, name).frombytes(self.column(f"{prefix}.{name}").cast("B"))
+        if len({len(getattr(table, name)) for name, _ in table_class.columns if name != "item"}) > 1:
+            raise ValueError(f"{self.path}: файл сцены поврежден (столбцы {prefix} разной длины)")
+        if "item" in dict(table_class.columns):
+            table.item.frombytes(bytes(table.item.itemsize * len(table)))
+        for color in self.palette(prefix):
+            table.palette.index(color)
+        if sys.byteorder == "big":
+            for name, _ in table_class.columns:
+                getattr(table, name).byteswap()
+        limits = {"color": len(table.palette.colors), "algorithm": len(ALGORITHMS), "kind": len(FIGURES)}
+        for name, limit in limits.items():
+            if hasattr(table, name) and max(getattr(table, name), default=-1) >= limit:
+                raise ValueError(f"{self.path}: файл сцены поврежден (номер вне таблицы в {prefix}.{name})")
+        return table
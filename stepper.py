@@ -0,0 +1,135 @@
+"""Пошаговое воспроизведение растеризации без блокировки цикла событий Tk.
+
+Вместо update() и time.sleep() внутри алгоритма поток точек выполняется
+порциями по таймеру after(): за один кадр рисуется столько точек, сколько
+положено по текущей задержке, но не дольше бюджета кадра. Между кадрами
+окно обрабатывает события, поэтому анимацию можно приостановить, пройти
+по одной точке, ускорить или прервать посреди примитива.
+"""
+import time
+from collections import deque
+
+FRAME_MS = 16 # Период кадра, мс
+FRAME_BUDGET = 0.008 # Сколько времени кадра можно тратить на рисование точек, с
+
+
+class Stepper:
+
+    def __init__(self, widget, delay=50, on_state=None):
+        self.widget = widget
+        self.delay = delay # Задержка между точками, мс (0 - как можно быстрее)
+        self.paused = False
+        self.on_state = on_state # Вызывается при смене состояния: для подписей кнопок и строки статуса
+        self._jobs = deque() # (итератор точек, рисование точки, после кадра, по завершении, при прерывании)
+        self._timer = None
+        self._last = 0.0
+        self._due = 0.0 # Сколько точек положено нарисовать к текущему моменту
+
+    @property
+    def running(self):
+        return bool(self._jobs)
+
+    def start(self, points, draw, on_frame=None, on_done=None, on_cancel=None):
+        # Примитивы выполняются по очереди в порядке добавления
+        self._jobs.append((iter(points), draw, on_frame, on_done, on_cancel))
+        self._schedule()
+        self._notify()
+
+    def play(self):
+        self.paused = False
+        self._schedule()
+        self._notify()
+
+    def pause(self):
+        self.paused = True
+        self._notify()
+
+    def toggle(self):
+        if self.paused:
+            self.play()
+        else:
+            self.pause()
+
+    def step(self):
+        # Одна точка; во время воспроизведения сначала ставит на паузу
+        self.paused = True
+        if self._jobs:
+            self._run(1)
+        self._notify()
+
+    def set_delay(self, delay):
+        self.delay = max(0, delay)
+        self._due = 0.0
+
+    def cancel(self):
+        # Прерывает текущий примитив; следующие в очереди продолжают выполняться.
+        # on_cancel получает еще не выданные точки, например чтобы дорисовать их сразу.
+        # cancel_all() on_cancel не вызывает: все сразу сбрасывает тот, кто перерисовывает заново
+        if self._jobs:
+            points, _, on_frame, _, on_cancel = self._jobs.popleft()
+            if on_cancel is not None:
+                on_cancel(points)
+            if on_frame is not None:
+                on_frame()
+        if not self._jobs:
+            self._stop()
+        self._notify()
+
+    def cancel_all(self):
+        self._jobs.clear()
+        self._stop()
+        self._notify()
+
+    def _stop(self):
+        if self._timer is not None:
+            self.widget.after_cancel(self._timer)
+            self._timer = None
+        self._due = 0.0
+
+    def _schedule(self):
+        if self._timer is None and self._jobs and not self.paused:
+            self._last = time.perf_counter()
+            self._timer = self.widget.after(min(FRAME_MS, max(1, self.delay)), self._tick)
+
+    def _tick(self):
+        self._timer = None
+        if self.paused or not self._jobs:
+            return
+        if self.delay:
+            # Число точек считается по фактически прошедшему времени: таймер Tk может опаздывать
+            self._due += (time.perf_counter() - self._last) * 1000 / self.delay
+            count = int(self._due)
+            self._due -= count
+        else:
+            count = -1 # Без ограничения, только бюджет кадра
+        if count:
+            self._run(count)
+        self._schedule()
+
+    def _run(self, count):
+        deadline = time.perf_counter() + FRAME_BUDGET
+        touched = []
+        while count and self._jobs:
+            points, draw, on_frame, on_done, _ = self._jobs[0]
+            if on_frame is not None and on_frame not in touched:
+                touched.append(on_frame)
+            for point in points:
+                draw(point)
+                count -= 1
+                if count == 0 or time.perf_counter() > deadline:
+                    break
+            else:
+                self._jobs.popleft()
+                if on_done is not None:
+                    on_done()
+                continue
+            break
+        for on_frame in touched:
+            on_frame()
+        if not self._jobs:
+            self._due = 0.0
+            self._notify()
+
+    def _notify(self):
+        if self.on_state is not None:
+            self.on_state(self)
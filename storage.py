@@ -0,0 +1,96 @@
+"""Компактное хранение примитивов для main.py, 2lab.py и 3lab.py.
+
+Примитивы лежат не в отдельных объектах, а по столбцам (struct of arrays):
+каждое поле - свой типизированный массив array, строка таблицы - индекс.
+Цвета хранятся номерами в общей палитре, идентификаторы элементов холста -
+целыми (0 - элемента нет).
+"""
+from array import array
+
+ALGORITHMS = ("dda", "bresenham", "wu")  # Коды алгоритмов отрезков
+FIGURES = ("Окружность", "Эллипс", "Гипербола", "Парабола")  # Коды фигур второго порядка
+CURVES = ("Эрмит", "Безье", "B-сплайн")  # Коды типов кривых
+
+
+class Palette:
+    """Цвета по номерам: в таблицах хранится номер, строка цвета - один раз."""
+
+    def __init__(self):
+        self.colors = []
+        self._index = {}
+
+    def index(self, color):
+        number = self._index.get(color)
+        if number is None:
+            number = self._index[color] = len(self.colors)
+            self.colors.append(color)
+        return number
+
+    def __getitem__(self, number):
+        return self.colors[number]
+
+
+class Table:
+    # Описание столбцов в подклассе: (имя, код типа array)
+    columns = ()
+
+    def __init__(self, palette=None):
+        self.palette = palette if palette is not None else Palette()
+        for name, typecode in self.columns:
+            setattr(self, name, array(typecode))
+
+    def __len__(self):
+        return len(getattr(self, self.columns[0][0]))
+
+    def _append(self, *values):
+        for (name, _), value in zip(self.columns, values):
+            getattr(self, name).append(value)
+        return len(self) - 1
+
+    def rows(self):
+        # Выгрузка всей таблицы построчно
+        return zip(*(getattr(self, name) for name, _ in self.columns))
+
+    def clear(self):
+        for name, typecode in self.columns:
+            setattr(self, name, array(typecode))
+
+
+class PointTable(Table):
+    """Точки: координаты, радиус маркера, номер цвета и элемент холста."""
+
+    columns = (("x", "d"), ("y", "d"), ("radius", "H"), ("color", "H"), ("item", "i"))
+
+    def append(self, x, y, radius=0, color="black", item=0):
+        return self._append(x, y, radius, self.palette.index(color), item)
+
+    def move(self, index, x, y):
+        self.x[index] = x
+        self.y[index] = y
+
+
+class SegmentTable(Table):
+    """Отрезки: концы, код алгоритма (ALGORITHMS) и номер цвета."""
+
+    columns = (("x0", "d"), ("y0", "d"), ("x1", "d"), ("y1", "d"), ("algorithm", "B"), ("color", "H"))
+
+    def append(self, x0, y0, x1, y1, algorithm, color="black"):
+        return self._append(x0, y0, x1, y1, ALGORITHMS.index(algorithm), self.palette.index(color))
+
+    def segments(self):
+        # (x0, y0, x1, y1, имя алгоритма) для растеризации
+        for x0, y0, x1, y1, code in zip(self.x0, self.y0, self.x1, self.y1, self.algorithm):
+            yield x0, y0, x1, y1, ALGORITHMS[code]
+
+
+class FigureTable(Table):
+    """Фигуры второго порядка: тип (FIGURES), центр, два размера и номер цвета."""
+
+    columns = (("kind", "B"), ("x", "i"), ("y", "i"), ("size1", "i"), ("size2", "i"), ("color", "H"))
+
+    def append(self, kind, x, y, size1, size2, color="black"):
+        return self._append(FIGURES.index(kind), x, y, size1, size2, self.palette.index(color))
+
+    def figures(self):
+        for code, x, y, size1, size2, color in self.rows():
+            yield FIGURES[code], x, y, size1, size2, self.palette[color]